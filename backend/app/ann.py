@@ -0,0 +1,131 @@
+"""Doküman aramasının ilk aşaması: chunk embedding'leri üzerinde en yakın komşu adayları
+
+ANN_INDEX ile seçilir:
+    hnsw  - hnswlib HNSW grafı; sorgu maliyeti korpus boyutuyla logaritmik büyür (varsayılan)
+    exact - embedding matrisiyle dot product + argpartition (doğrusal)
+    auto  - hnswlib kuruluysa hnsw, değilse exact
+
+hnswlib modülü requirements.txt'teki chroma-hnswlib paketinden gelir (derleme
+gerektirmeyen wheel'ler; upstream hnswlib sadece kaynak olarak yayınlanır).
+Graf index artifact'ına (hnsw.bin) yazılır, worker'lar yeniden kurmak yerine
+diskten açar. hnswlib vektörlerin kendi kopyasını tutar; bu kopya mmap'li
+embedding'ler gibi worker'lar arasında paylaşılmaz.
+"""
+import importlib.util
+import os
+from typing import Optional
+
+import numpy as np
+
+from app.retrieval import top_k_indices
+
+ANN_INDEX = os.getenv('ANN_INDEX', 'hnsw')
+HNSW_M = int(os.getenv('HNSW_M', '16'))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '200'))
+# Sorgu anındaki aday listesi genişliği (recall/gecikme dengesi); hnswlib en az k kullanır
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '128'))
+
+ANN_INDEXES = ('auto', 'hnsw', 'exact')
+HNSW_FILE = 'hnsw.bin'
+
+
+def resolve_ann_index(name: str = ANN_INDEX) -> str:
+    """'auto'yu kurulu paketlere göre çöz; hnsw istenip hnswlib yoksa ImportError"""
+    if name not in ANN_INDEXES:
+        raise ValueError(f"Unknown ANN index: {name}")
+    available = importlib.util.find_spec('hnswlib') is not None
+    if name == 'auto':
+        return 'hnsw' if available else 'exact'
+    if name == 'hnsw' and not available:
+        raise ImportError("ANN_INDEX=hnsw requires hnswlib; install it with: pip install -r requirements.txt "
+                          "(or set ANN_INDEX=exact)")
+    return name
+
+
+def candidate_ids(size: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Index'e girecek satırlar; mask verilirse sadece cevap olabilecek chunk'lar
+
+    Başlık ve boyu aralık dışındaki chunk'lar ikinci aşamada zaten elenir; indekste
+    olsalar RETRIEVAL_TOP_K aday yerini boşa harcarlar.
+    """
+    return np.arange(size, dtype=np.int64) if mask is None else np.flatnonzero(mask).astype(np.int64)
+
+
+class ExactIndex:
+    """Tam tarama - küçük korpuslar ve hnswlib olmayan kurulumlar için"""
+    name = 'exact'
+
+    def __init__(self, embeddings: np.ndarray, mask: Optional[np.ndarray] = None):
+        self.embeddings = embeddings
+        self.mask = mask
+
+    def search(self, query: np.ndarray, k: int) -> tuple:
+        """(chunk indeksleri, cosine similarity) - azalan sırada en fazla k aday"""
+        similarities = np.dot(self.embeddings, query)
+        if self.mask is not None:
+            similarities = np.where(self.mask, similarities, -np.inf)
+        ids = top_k_indices(similarities, k)
+        ids = ids[np.isfinite(similarities[ids])]
+        return ids, similarities[ids]
+
+
+class HnswIndex:
+    name = 'hnsw'
+
+    def __init__(self, index):
+        self.index = index
+        # knn_query eşzamanlı çağrılabilir, set_ef çağrılamaz - bir kez ayarla
+        self.index.set_ef(HNSW_EF_SEARCH)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, mask: Optional[np.ndarray] = None, m: int = HNSW_M,
+              ef_construction: int = HNSW_EF_CONSTRUCTION) -> 'HnswIndex':
+        import hnswlib
+
+        # Label = store'daki chunk indeksi; arama sonuçları doğrudan store'a işaret eder
+        ids = candidate_ids(len(embeddings), mask)
+        # Normalize vektörlerde inner product = cosine similarity
+        index = hnswlib.Index(space='ip', dim=embeddings.shape[1])
+        index.init_index(max_elements=max(1, len(ids)), M=m, ef_construction=ef_construction)
+        if len(ids):
+            index.add_items(np.asarray(embeddings[ids], dtype=np.float32), ids)
+        return cls(index)
+
+    @classmethod
+    def load(cls, path: str, dim: int, ids: np.ndarray) -> 'HnswIndex':
+        """Kayıtlı grafı aç; içindeki label'lar ids ile aynı değilse (ör. uygunluk eşikleri değişti) ValueError"""
+        import hnswlib
+
+        index = hnswlib.Index(space='ip', dim=dim)
+        index.load_index(os.path.join(path, HNSW_FILE), max_elements=max(1, len(ids)))
+        if not np.array_equal(np.sort(np.asarray(index.get_ids_list(), dtype=np.int64)), ids):
+            raise ValueError(f"HNSW graph has {index.get_current_count()} vectors for {len(ids)} eligible chunks")
+        return cls(index)
+
+    def save(self, path: str):
+        self.index.save_index(os.path.join(path, HNSW_FILE))
+
+    def search(self, query: np.ndarray, k: int) -> tuple:
+        k = min(k, self.index.get_current_count())
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        labels, distances = self.index.knn_query(query, k=k)
+        # 'ip' uzayında mesafe = 1 - inner product
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+
+def build_ann_index(embeddings: np.ndarray, mask: Optional[np.ndarray] = None, kind: str = ANN_INDEX):
+    if resolve_ann_index(kind) == 'hnsw':
+        return HnswIndex.build(embeddings, mask)
+    return ExactIndex(embeddings, mask)
+
+
+def load_ann_index(path: str, embeddings: np.ndarray, mask: Optional[np.ndarray] = None, kind: str = ANN_INDEX):
+    """Artifact'taki HNSW grafını aç; yoksa, bozuksa veya mask'le uyuşmuyorsa embedding'lerden yeniden kur"""
+    if resolve_ann_index(kind) != 'hnsw':
+        return ExactIndex(embeddings, mask)
+    try:
+        return HnswIndex.load(path, embeddings.shape[1], candidate_ids(len(embeddings), mask))
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"HNSW graph at {path} could not be read ({e}), rebuilding")
+        return HnswIndex.build(embeddings, mask)
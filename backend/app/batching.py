@@ -0,0 +1,123 @@
+"""Eşzamanlı sorgular için mikro-batch embedding zamanlayıcısı
+
+Her /ask kendi sorusunu tek başına encode etmek yerine kuyruğa koyar; zamanlayıcı
+ilk isteğin gelişinden itibaren en fazla EMBED_BATCH_MAX_WAIT_MS bekler veya
+EMBED_BATCH_MAX_SIZE isteğe ulaşınca hepsini tek bir encode çağrısıyla çalıştırır
+ve her sonucu bekleyen isteğe geri verir.
+
+Bir batch encode edilirken gelen istekler zaten kuyrukta birikip sıradaki batch'i
+oluşturur; bu yüzden varsayılan bekleme 0'dır ve düşük yükte gecikme eklemez.
+Ani yük patlamalarında daha büyük batch'ler için birkaç ms'lik pencere açılabilir
+(bkz. `python -m app.benchmark batching`).
+"""
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from typing import Callable, List
+
+import numpy as np
+
+EMBED_BATCHING = os.getenv('EMBED_BATCHING', '1') == '1'
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv('EMBED_BATCH_MAX_WAIT_MS', '0'))
+EMBED_BATCH_MAX_SIZE = int(os.getenv('EMBED_BATCH_MAX_SIZE', '32'))
+# Aynı anda çalışabilecek batch sayısı; 1 iken bir batch encode edilirken sıradaki birikir
+EMBED_BATCH_CONCURRENCY = int(os.getenv('EMBED_BATCH_CONCURRENCY', '1'))
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], run: Callable,
+                 max_batch_size: int = EMBED_BATCH_MAX_SIZE, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+                 concurrency: int = EMBED_BATCH_CONCURRENCY):
+        # encode: texts -> (n, dim) matris (sync); run: async run(fn, *args), ör. thread pool'da çalıştırıcı
+        self.encode_fn = encode
+        self.run = run
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.concurrency = concurrency
+        self.queue = None
+        self.slots = None
+        self.dispatcher = None
+        # Çalışan batch task'larına güçlü referans (event loop sadece zayıf referans tutar)
+        self.running = set()
+        # Metrikler
+        self.batch_sizes = Counter()
+        self.queue_waits = deque(maxlen=2048)
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        if self.dispatcher is None or self.dispatcher.done():
+            self.queue = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.concurrency)
+            self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Tek bir metni bir sonraki batch'e ekle ve embedding'ini bekle"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _dispatch(self):
+        while True:
+            # Bir batch slotu boşalana kadar istekler kuyrukta birikir
+            await self.slots.acquire()
+            first = await self.queue.get()
+            batch = [first]
+            deadline = first[2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Beklemeden hazır olanları da al
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            task = asyncio.create_task(self._run_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run_batch(self, batch: list):
+        started = time.perf_counter()
+        try:
+            for _, _, enqueued_at in batch:
+                self.queue_waits.append(started - enqueued_at)
+            self.batch_sizes[len(batch)] += 1
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                embeddings = await self.run(self.encode_fn, [text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for i, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    future.set_result(embeddings[i])
+        finally:
+            self.slots.release()
+
+    async def close(self):
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            await asyncio.gather(self.dispatcher, return_exceptions=True)
+            self.dispatcher = None
+
+    def stats(self) -> dict:
+        waits = np.array(self.queue_waits) * 1000.0 if self.queue_waits else np.zeros(1)
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+            'batch_sizes': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            'queue_wait_ms': {
+                'p50': float(np.percentile(waits, 50)),
+                'p99': float(np.percentile(waits, 99)),
+                'max': float(waits.max()),
+            },
+        }
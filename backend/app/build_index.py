@@ -0,0 +1,43 @@
+"""Index artifact'ını offline üret ve yeni generation olarak yayınla
+
+Kullanım (backend/ dizininden):
+    python -m app.build_index [--index-dir index]
+
+Servis çalışırken de çalıştırılabilir: worker'lar CURRENT'ı izler
+(INDEX_WATCH_INTERVAL) ve yeni generation'a istek düşürmeden geçer.
+"""
+import argparse
+import asyncio
+
+from app import main as assistant
+from app.index_store import INDEX_DIR, acquire_build_lock, release_build_lock, save_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Boundless index artifact'ını oluştur")
+    parser.add_argument('--index-dir', default=INDEX_DIR)
+    args = parser.parse_args()
+
+    # Açılışta index'i kendisi üreten bir worker ile aynı anda scrape etme
+    lock = acquire_build_lock(args.index_dir)
+    try:
+        try:
+            asyncio.run(assistant.fetch_and_process_data())
+        except RuntimeError as e:
+            raise SystemExit(f"[!] Hiç chunk üretilemedi, artifact yazılmadı ({e}).")
+
+        path = save_index(
+            args.index_dir,
+            assistant.chunk_store,
+            assistant.MODEL_NAME,
+            assistant.CHUNKER_PARAMS,
+            assistant.keyword_index,
+            assistant.ann_index,
+        )
+    finally:
+        release_build_lock(lock)
+    print(f"[+] {len(assistant.chunk_store)} chunk {path} dizinine yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
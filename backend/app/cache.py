@@ -0,0 +1,119 @@
+"""/ask için cevap önbelleği
+
+İki katman:
+    exact    - normalize edilmiş soru metni -> cevap
+    semantic - soru embedding'i önbellekteki bir sorununkine ANSWER_CACHE_SIMILARITY
+               (cosine) kadar yakınsa o cevap yeniden kullanılır
+
+Boyut sınırlı (LRU) ve her kayıt ANSWER_CACHE_TTL saniye sonra geçersiz olur.
+Index yenilendiğinde clear() ile tamamen boşaltılır; clear() epoch'u artırır ve
+eski epoch'ta başlamış isteklerin put() çağrıları yazılmaz (yenilemeden önceki
+index'le üretilmiş cevap önbelleğe geri girmesin).
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '1024'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+# 1'den büyük bir değer semantic katmanı kapatır
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+
+
+class AnswerCache:
+    def __init__(self, max_size: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        # key -> (response, embedding slot veya None, son geçerlilik zamanı); sıra = LRU sırası
+        self.entries = OrderedDict()
+        # Semantic katman: sabit boyutlu embedding matrisi, slot -> key
+        self.embeddings = None
+        self.slot_keys = [None] * max_size
+        self.occupied = np.zeros(max_size, dtype=bool)
+        self.free_slots = list(range(max_size - 1, -1, -1))
+        self.hits = {'exact': 0, 'semantic': 0}
+        self.misses = 0
+        self.evictions = 0
+        self.epoch = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.max_size > 0 and self.similarity <= 1.0
+
+    def _remove(self, key: str):
+        _, slot, _ = self.entries.pop(key)
+        if slot is not None:
+            self.slot_keys[slot] = None
+            self.occupied[slot] = False
+            self.free_slots.append(slot)
+
+    def _lookup(self, key: str, layer: str) -> Optional[dict]:
+        response, _, expires_at = self.entries[key]
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        self.hits[layer] += 1
+        return dict(response)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Exact katman; bulunamazsa None (miss sayılmaz, semantic katman sonra denenebilir)"""
+        if key in self.entries:
+            return self._lookup(key, 'exact')
+        return None
+
+    def get_semantic(self, embedding: np.ndarray) -> Optional[dict]:
+        """Embedding'i önbellekteki en yakın soruyla karşılaştır"""
+        if self.semantic_enabled and self.embeddings is not None and len(self.entries):
+            similarities = np.where(self.occupied, self.embeddings @ embedding, -np.inf)
+            slot = int(np.argmax(similarities))
+            if similarities[slot] >= self.similarity:
+                response = self._lookup(self.slot_keys[slot], 'semantic')
+                if response is not None:
+                    return response
+        return None
+
+    def record_miss(self):
+        self.misses += 1
+
+    def put(self, key: str, embedding: Optional[np.ndarray], response: dict, epoch: Optional[int] = None):
+        """epoch verilirse ve o zamandan beri clear() çağrıldıysa yazmadan dön"""
+        if self.max_size <= 0 or (epoch is not None and epoch != self.epoch):
+            return
+        if key in self.entries:
+            self._remove(key)
+        while len(self.entries) >= self.max_size:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+        slot = None
+        if embedding is not None and self.semantic_enabled:
+            if self.embeddings is None:
+                self.embeddings = np.zeros((self.max_size, len(embedding)), dtype=np.float32)
+            slot = self.free_slots.pop()
+            self.embeddings[slot] = embedding
+            self.slot_keys[slot] = key
+            self.occupied[slot] = True
+        self.entries[key] = (dict(response), slot, time.monotonic() + self.ttl)
+
+    def clear(self):
+        """Index yenilendiğinde tüm kayıtları geçersiz kıl"""
+        self.epoch += 1
+        self.entries.clear()
+        self.slot_keys = [None] * self.max_size
+        self.occupied[:] = False
+        self.free_slots = list(range(self.max_size - 1, -1, -1))
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': dict(self.hits),
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
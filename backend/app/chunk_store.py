@@ -0,0 +1,194 @@
+"""Kolon bazlı chunk deposu
+
+Chunk başına bir dict yerine:
+    urls        - tekil URL tablosu; chunk'lar url_ids (int32) ile gösterir
+    blob        - tüm chunk metinleri UTF-8 olarak art arda; offsets[i]:offsets[i + 1] = i. chunk (byte)
+    lengths     - karakter uzunlukları (int32), is_title - 'Title:' chunk'ları (bool)
+    chunk_ids   - sayfa içi sıra (int32), hashes - içerik hash'leri (ASCII hex, S40)
+    embeddings  - aynı sırada L2-normalize float32 matris
+
+Uzunluk ve başlık filtreleri kurulumda bir kez hesaplanır; sorgu anında
+eligible_mask() vektörel maske döndürür. Ingest tarafı ChunkStoreBuilder ile
+batch batch ekler, /ask tarafı sadece indeks ile okur.
+
+Diskten açılırken blob ve tüm kolonlar read-only mmap edilir; aynı artifact'ı
+açan uvicorn worker'ları metni ve vektörleri page cache üzerinden paylaşır.
+"""
+import json
+import mmap
+import os
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+TITLE_PREFIX = 'Title:'
+# /ask'te cevap olarak kullanılabilecek chunk uzunluk aralığı (karakter)
+MIN_ANSWER_CHARS = 20
+MAX_ANSWER_CHARS = 800
+
+URLS_FILE = 'urls.json'
+BLOB_FILE = 'blob.bin'
+# Her kolon ayrı .npy - npz mmap edilemez
+COLUMNS = ('url_ids', 'offsets', 'lengths', 'is_title', 'chunk_ids', 'hashes')
+EMBEDDINGS_FILE = 'embeddings.npy'
+
+
+class ChunkStore:
+    def __init__(self, urls: List[str], url_ids: np.ndarray, blob: bytes, offsets: np.ndarray,
+                 lengths: np.ndarray, is_title: np.ndarray, chunk_ids: np.ndarray, hashes: np.ndarray,
+                 embeddings: np.ndarray):
+        self.urls = urls
+        self.url_ids = url_ids
+        # bytes veya mmap
+        self.blob = blob
+        self.offsets = offsets
+        self.lengths = lengths
+        self.is_title = is_title
+        self.chunk_ids = chunk_ids
+        self.hashes = hashes
+        self.embeddings = embeddings
+        self._eligible = None
+        # Artifact'tan açıldığında load_index meta'daki created_at ve generation adıyla değiştirir
+        self.built_at = time.time()
+        self.generation = None
+
+    @classmethod
+    def from_records(cls, records: List[dict], embeddings: Optional[np.ndarray] = None) -> 'ChunkStore':
+        """{'content', 'url', ['chunk_id', 'hash']} listesinden kur"""
+        builder = ChunkStoreBuilder()
+        builder.add(records, embeddings)
+        return builder.build()
+
+    @classmethod
+    def empty(cls, dim: int) -> 'ChunkStore':
+        return ChunkStoreBuilder().build(dim)
+
+    def __len__(self) -> int:
+        return len(self.url_ids)
+
+    def text(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def url(self, i: int) -> str:
+        return self.urls[self.url_ids[i]]
+
+    def record(self, i: int) -> dict:
+        return {
+            'content': self.text(i),
+            'url': self.url(i),
+            'chunk_id': int(self.chunk_ids[i]),
+            'hash': self.hashes[i].decode('ascii'),
+        }
+
+    def neighbor(self, i: int, step: int) -> Optional[int]:
+        """Aynı URL'de chunk_id'si step kadar ötedeki chunk'ın indeksi (depoda sayfa sırasıyla duruyorsa)"""
+        j = i + step
+        if (0 <= j < len(self) and self.url_ids[j] == self.url_ids[i] and self.chunk_ids[i] >= 0
+                and self.chunk_ids[j] == self.chunk_ids[i] + step):
+            return j
+        return None
+
+    def texts(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self.text(i)
+
+    def eligible_mask(self) -> np.ndarray:
+        """Cevap olabilecek chunk'lar: uzunluk aralığında ve başlık olmayan"""
+        if self._eligible is None:
+            self._eligible = (
+                (self.lengths >= MIN_ANSWER_CHARS) & (self.lengths <= MAX_ANSWER_CHARS) & ~self.is_title
+            )
+        return self._eligible
+
+    def nbytes(self) -> int:
+        """Metin + kolonlar + embedding'lerin yaklaşık bellek kullanımı (mmap'li kısımlar dahil)"""
+        columns = [getattr(self, name) for name in COLUMNS]
+        return len(self.blob) + sum(column.nbytes for column in columns) + self.embeddings.nbytes
+
+    def save(self, path: str):
+        """Blob'u ve kolonları dizine yaz (hepsi mmap ile açılabilir)"""
+        with open(os.path.join(path, URLS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.urls, f, ensure_ascii=False)
+        with open(os.path.join(path, BLOB_FILE), 'wb') as f:
+            f.write(self.blob)
+        for name in COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        np.save(os.path.join(path, EMBEDDINGS_FILE), np.ascontiguousarray(self.embeddings, dtype=np.float32))
+
+    @classmethod
+    def load(cls, path: str, mmap_arrays: bool = True) -> 'ChunkStore':
+        with open(os.path.join(path, URLS_FILE), encoding='utf-8') as f:
+            urls = json.load(f)
+        with open(os.path.join(path, BLOB_FILE), 'rb') as f:
+            if mmap_arrays and os.fstat(f.fileno()).st_size:
+                # mmap dosya kapandıktan sonra da geçerli kalır
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                blob = f.read()
+        mode = 'r' if mmap_arrays else None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in COLUMNS}
+        embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode=mode)
+        url_ids, offsets = columns['url_ids'], columns['offsets']
+        if len(offsets) != len(url_ids) + 1 or offsets[-1] != len(blob):
+            raise ValueError(f"blob/offset mismatch ({len(url_ids)} chunks, {len(blob)} bytes)")
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(url_ids):
+            raise ValueError(f"{embeddings.shape[0]} vectors for {len(url_ids)} chunks")
+        return cls(urls, embeddings=embeddings, blob=blob, **columns)
+
+
+class ChunkStoreBuilder:
+    """Ingest batch'lerini kolonlara ekleyip tek ChunkStore üretir"""
+
+    def __init__(self):
+        self.urls = []
+        self.url_index = {}
+        self.url_ids = []
+        self.parts = []
+        self.offsets = [0]
+        self.lengths = []
+        self.is_title = []
+        self.chunk_ids = []
+        self.hashes = []
+        self.embeddings = []
+
+    def __len__(self) -> int:
+        return len(self.url_ids)
+
+    def add(self, records: List[dict], embeddings: Optional[np.ndarray] = None):
+        for record in records:
+            url = record.get('url')
+            url_id = self.url_index.get(url)
+            if url_id is None:
+                url_id = self.url_index[url] = len(self.urls)
+                self.urls.append(url)
+            content = record['content']
+            encoded = content.encode('utf-8')
+            self.url_ids.append(url_id)
+            self.parts.append(encoded)
+            self.offsets.append(self.offsets[-1] + len(encoded))
+            self.lengths.append(len(content))
+            self.is_title.append(content.startswith(TITLE_PREFIX))
+            chunk_id = record.get('chunk_id')
+            self.chunk_ids.append(-1 if chunk_id is None else chunk_id)
+            self.hashes.append(record.get('hash') or '')
+        if embeddings is not None and len(records):
+            self.embeddings.append(np.asarray(embeddings, dtype=np.float32))
+
+    def build(self, dim: int = 0) -> ChunkStore:
+        if self.embeddings:
+            embeddings = np.ascontiguousarray(np.vstack(self.embeddings), dtype=np.float32)
+        else:
+            embeddings = np.zeros((len(self.url_ids), dim), dtype=np.float32)
+        return ChunkStore(
+            list(self.urls),
+            np.array(self.url_ids, dtype=np.int32),
+            b''.join(self.parts),
+            np.array(self.offsets, dtype=np.int64),
+            np.array(self.lengths, dtype=np.int32),
+            np.array(self.is_title, dtype=bool),
+            np.array(self.chunk_ids, dtype=np.int32),
+            # U40 chunk başına 160 byte tutuyordu; sha1 hex ASCII'dir. Ham 20 byte (S20) sondaki \x00'ları kaybeder
+            np.array([h.encode('ascii') for h in self.hashes], dtype='S40'),
+            embeddings,
+        )
@@ -0,0 +1,138 @@
+"""Ortak, akış tabanlı chunk'lama motoru
+
+main.py, load_docs.py ve load_docs_postgres.py aynı Chunker'ı farklı boyutlarla kullanır:
+    - Cümleler metin bir kez taranarak generator ile üretilir (. ! ? sonrası boşluk ve satır sonları)
+    - Boyut kelime değil token sayısıdır; her cümle bir kez sayılır, chunk uzunluğu
+      toplam olarak tutulur (eski `(chunk + sent).split()` döngüsü chunk boyunda kareseldi)
+    - max_tokens modelin sınırını (EMBEDDING_MAX_TOKENS, özel token'lar hariç) aşamaz;
+      sınırdan uzun tek cümleler kelime sınırından bölünür
+    - overlap_tokens kadar son cümleler bir sonraki chunk'ın başına taşınır
+    - Sayfa içinde birebir tekrar eden chunk'lar hash ile atlanır
+
+Token sayımı embedding modelinin tokenizer'ı ile yapılır; tokenizer yoksa
+kelime + noktalama sayısı yaklaşık değer olarak kullanılır.
+"""
+import hashlib
+import math
+import os
+import re
+import string
+from typing import Callable, Iterator, List, Optional
+
+EMBEDDING_MAX_TOKENS = int(os.getenv('EMBEDDING_MAX_TOKENS', '256'))
+# Ardışık chunk'lar arasında tekrar edilecek token sayısı (0 = overlap yok)
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '0'))
+# [CLS] ve [SEP] model sınırına dahil
+SPECIAL_TOKENS = 2
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+# Yaklaşık sayımda ayrı token sayılan noktalama işaretleri
+PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+def split_sentences(text: str) -> Iterator[str]:
+    """Satırları (blok sınırları) ve . ! ? sonrası boşlukları cümle sınırı say; boş parçalar atlanır"""
+    for line in text.split('\n'):
+        for sentence in SENTENCE_END_RE.split(line):
+            sentence = sentence.strip()
+            if sentence:
+                yield sentence
+
+
+def approx_token_counts(sentences: List[str]) -> List[int]:
+    """Tokenizer yoksa: kelime + noktalama sayısı (WordPiece için alt sınır)"""
+    return [len(sentence.split()) + len(sentence) - len(sentence.translate(PUNCTUATION)) for sentence in sentences]
+
+
+class Chunker:
+    """chunk(text) -> chunk listesi; ingest()'e doğrudan verilebilir"""
+
+    def __init__(self, max_tokens: int, overlap_tokens: int = 0, min_words: int = 0,
+                 tokenizer: Optional[Callable] = None, tokenizer_name: str = 'approx'):
+        self.max_tokens = min(max_tokens, EMBEDDING_MAX_TOKENS - SPECIAL_TOKENS)
+        self.overlap_tokens = min(overlap_tokens, self.max_tokens // 2)
+        self.min_words = min_words
+        # tokenizer: () -> HF tokenizer; model arka planda yüklenebildiği için ilk kullanımda çağrılır
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name if tokenizer is not None else 'approx'
+        self._count = None
+
+    def params(self) -> dict:
+        """Index artifact anahtarı - chunk sınırlarını etkileyen her şey"""
+        return {
+            'chunker': 'sentence-tokens',
+            'max_tokens': self.max_tokens,
+            'overlap_tokens': self.overlap_tokens,
+            'min_words': self.min_words,
+            'tokenizer': self.tokenizer_name,
+        }
+
+    def count_tokens(self, sentences: List[str]) -> List[int]:
+        """Cümlelerin token sayıları (tek batch tokenizer çağrısı)"""
+        if self._count is None:
+            tokenizer = self.tokenizer() if self.tokenizer is not None else None
+            if tokenizer is None:
+                self._count = approx_token_counts
+            else:
+                self._count = lambda items: [
+                    len(ids) for ids in tokenizer(items, add_special_tokens=False)['input_ids']
+                ]
+        return self._count(sentences) if sentences else []
+
+    def _split_long(self, sentence: str, tokens: int) -> Iterator[tuple]:
+        """max_tokens'tan uzun cümleyi kelime sınırından eşit parçalara böl"""
+        words = sentence.split()
+        parts = max(2, math.ceil(tokens / self.max_tokens))
+        size = max(1, math.ceil(len(words) / parts))
+        pieces = [' '.join(words[i:i + size]) for i in range(0, len(words), size)]
+        for piece, piece_tokens in zip(pieces, self.count_tokens(pieces)):
+            if piece_tokens > self.max_tokens and len(piece.split()) > 1:
+                yield from self._split_long(piece, piece_tokens)
+            else:
+                yield piece, piece_tokens
+
+    def _units(self, text: str) -> Iterator[tuple]:
+        """(cümle, token sayısı) akışı; sınırı aşan cümleler bölünmüş olarak"""
+        sentences = list(split_sentences(text))
+        for sentence, tokens in zip(sentences, self.count_tokens(sentences)):
+            if tokens > self.max_tokens:
+                yield from self._split_long(sentence, tokens)
+            else:
+                yield sentence, tokens
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        current = []
+        current_tokens = 0
+        carried = 0  # current'ın başındaki, önceki chunk'tan taşınan cümle sayısı
+        for sentence, tokens in self._units(text):
+            if current and current_tokens + tokens > self.max_tokens:
+                if len(current) > carried:
+                    yield ' '.join(s for s, _ in current)
+                # Overlap: son cümlelerden overlap_tokens'a sığanları taşı
+                tail = []
+                tail_tokens = 0
+                for item in reversed(current):
+                    if tail_tokens + item[1] > self.overlap_tokens or tail_tokens + item[1] + tokens > self.max_tokens:
+                        break
+                    tail.append(item)
+                    tail_tokens += item[1]
+                current = tail[::-1]
+                current_tokens = tail_tokens
+                carried = len(current)
+            current.append((sentence, tokens))
+            current_tokens += tokens
+        if len(current) > carried:
+            yield ' '.join(s for s, _ in current)
+
+    def __call__(self, text: str) -> List[str]:
+        chunks = []
+        seen = set()
+        for chunk in self.iter_chunks(text):
+            if self.min_words and len(chunk.split()) < self.min_words:
+                continue
+            digest = hashlib.sha1(chunk.encode('utf-8')).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            chunks.append(chunk)
+        return chunks
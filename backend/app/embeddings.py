@@ -0,0 +1,77 @@
+"""Seçilebilir embedding inference backend'i
+
+EMBEDDING_BACKEND ile seçilir; main.py, load_docs.py ve load_docs_postgres.py aynı
+load_embedder()'ı kullanır:
+    torch - PyTorch SentenceTransformer (varsayılan)
+    onnx  - ONNX Runtime, fp32 (sentence-transformers backend="onnx")
+    int8  - dinamik int8 quantize edilmiş ONNX modeli
+
+onnx/int8 opsiyonel bağımlılık ister: pip install -r requirements-onnx.txt
+Modeller offline üretilir (bkz. app/export_embedder.py):
+    <EMBEDDING_MODEL_DIR>/<model>-onnx/onnx/model.onnx
+    <EMBEDDING_MODEL_DIR>/<model>-onnx/onnx/model_int8.onnx
+"""
+import importlib.util
+import os
+
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+EMBEDDING_MODEL_DIR = os.getenv(
+    'EMBEDDING_MODEL_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+)
+# Quantize edilmiş dosya adı son eki - export ve yükleme aynı adı kullanır
+INT8_FILE_SUFFIX = 'int8'
+
+EMBEDDING_BACKENDS = ('torch', 'onnx', 'int8')
+
+
+def export_path(model_name: str = EMBEDDING_MODEL, model_dir: str = EMBEDDING_MODEL_DIR) -> str:
+    """Export edilmiş ONNX modellerinin dizini"""
+    return os.path.join(model_dir, f"{model_name.replace('/', '_')}-onnx")
+
+
+def int8_file_name() -> str:
+    return f"onnx/model_{INT8_FILE_SUFFIX}.onnx"
+
+
+def embedding_model_id(model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND) -> str:
+    """Index artifact anahtarı: int8 embedding'leri fp32 olanlarla karıştırılmasın"""
+    if backend == 'int8':
+        return f"{model_name}-{INT8_FILE_SUFFIX}"
+    return model_name
+
+
+def require_onnx():
+    """ONNX backend'leri için opsiyonel paketleri kontrol et"""
+    missing = [name for name in ('onnxruntime', 'optimum') if importlib.util.find_spec(name) is None]
+    if missing:
+        raise ImportError(
+            f"EMBEDDING_BACKEND=onnx/int8 requires {', '.join(missing)}; "
+            f"install them with: pip install -r requirements-onnx.txt"
+        )
+
+
+def load_embedder(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL,
+                  model_dir: str = EMBEDDING_MODEL_DIR):
+    """Seçilen backend ile SentenceTransformer örneği döndür"""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    # torch importu pahalı - sadece model gerçekten yüklenirken
+    from sentence_transformers import SentenceTransformer
+
+    if backend == 'torch':
+        return SentenceTransformer(model_name)
+
+    require_onnx()
+    path = export_path(model_name, model_dir)
+    if backend == 'onnx':
+        # Export yoksa sentence-transformers hub'daki ONNX dosyasını indirir veya anında export eder
+        source = path if os.path.exists(os.path.join(path, 'onnx', 'model.onnx')) else model_name
+        return SentenceTransformer(source, backend='onnx')
+
+    if not os.path.exists(os.path.join(path, int8_file_name())):
+        raise FileNotFoundError(
+            f"Quantized model not found at {os.path.join(path, int8_file_name())}; "
+            f"run: python -m app.export_embedder"
+        )
+    return SentenceTransformer(path, backend='onnx', model_kwargs={'file_name': int8_file_name()})
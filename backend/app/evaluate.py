@@ -0,0 +1,326 @@
+"""Etiketli soru seti ile offline retrieval ve gecikme değerlendirmesi
+
+Canlı dokümanlardan alınmış sabit bir snapshot (app/data/eval_corpus.json,
+URL -> HTML; --snapshot-corpus ile üretilip repoya eklenir) üzerinde çalışır ve
+ağa çıkmaz: sayfalar servisle aynı ingest hattından (extract, chunk,
+embedding) geçirilip geçici bir dizinde index'e yazılır, web araması sabit bir
+stub ile değiştirilir ve index izleme kapatılır. Böylece --baseline ile
+karşılaştırılan koşular aynı korpusu görür; farklar sadece koddan veya
+chunker/model ayarlarından gelir.
+
+Kullanım (backend/ dizininden):
+    python -m app.evaluate --output eval.json
+    python -m app.evaluate --output eval-new.json --baseline eval.json
+
+    # Korpusu canlı dokümanlardan al/yenile (sonuçlar önceki koşularla karşılaştırılamaz)
+    python -m app.evaluate --snapshot-corpus
+
+Elle yazılmış sayfalar soru etiketleriyle aynı elden çıktığı için ölçümü
+anlamsız kılar; tests/data/synthetic_corpus.json sadece testler içindir.
+
+Rapor (JSON):
+    documentation - source_url'i etiketli sorularda URL düzeyinde recall@k ve MRR
+    stages        - predefined / documentation / web_search aşamalarının cevapladığı
+                    soru oranı ve cevabın beklenen URL'yi (veya aşamayı) tutturma oranı
+    latency       - aşama başına p50/p95/p99 ve histogram (ms)
+    questions     - soru bazında sonuçlar
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from app import main as assistant
+from app.chunk_store import ChunkStoreBuilder
+from app.index_store import current_generation, index_path, save_index
+from app.ingest import BOUNDLESS_URLS, extract_page_text, ingest, make_client
+
+EVAL_QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'eval_questions.json')
+EVAL_CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'eval_corpus.json')
+# Histogram üst sınırları (ms); son kova sonsuz
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+STAGES = ['predefined', 'documentation', 'web_search']
+OFFLINE_WEB_ANSWER = "[offline evaluation] web search skipped"
+
+
+async def offline_search_web(query: str) -> str:
+    return OFFLINE_WEB_ANSWER
+
+
+def latency_summary(samples: list) -> dict:
+    values = np.array(samples) * 1000.0 if samples else np.zeros(0)
+    counts = np.histogram(values, bins=[0] + LATENCY_BUCKETS_MS + [np.inf])[0] if len(values) else []
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()) if len(values) else None,
+        'p50_ms': float(np.percentile(values, 50)) if len(values) else None,
+        'p95_ms': float(np.percentile(values, 95)) if len(values) else None,
+        'p99_ms': float(np.percentile(values, 99)) if len(values) else None,
+        'histogram_ms': {
+            f"<={bound}" if bound != np.inf else f">{LATENCY_BUCKETS_MS[-1]}": int(count)
+            for bound, count in zip(LATENCY_BUCKETS_MS + [np.inf], counts)
+        },
+    }
+
+
+def ranked_urls(results: list) -> list:
+    """Sıralı chunk sonuçlarından ilk geçiş sırasına göre tekil URL'ler"""
+    urls = []
+    for chunk, _ in results:
+        if chunk['url'] not in urls:
+            urls.append(chunk['url'])
+    return urls
+
+
+def fixture_client(pages: dict) -> httpx.AsyncClient:
+    """Sayfaları ağ yerine korpus dosyasından döndüren client"""
+    def handler(request):
+        html = pages.get(str(request.url))
+        if html is None:
+            return httpx.Response(404)
+        return httpx.Response(200, text=html, headers={'content-type': 'text/html; charset=utf-8'})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def build_fixture_index(pages: dict, index_dir: str):
+    """Korpusu servisin ingest hattından geçir ve index_dir'e generation olarak yaz"""
+    await asyncio.to_thread(assistant.get_embedder)
+    builder = ChunkStoreBuilder()
+    async with fixture_client(pages) as client:
+        async for batch, batch_embeddings in ingest(list(pages), extract_page_text, assistant.chunker,
+                                                    embed=assistant.encode_normalized, client=client):
+            builder.add(batch, batch_embeddings)
+    store = builder.build(assistant.EMBEDDING_DIM)
+    if not len(store):
+        raise SystemExit("[!] Korpustan hiç chunk üretilemedi.")
+    await asyncio.to_thread(save_index, index_dir, store, assistant.MODEL_NAME, assistant.CHUNKER_PARAMS)
+    return store
+
+
+async def snapshot_corpus(path: str):
+    """BOUNDLESS_URLS'in güncel HTML'ini korpus dosyasına yaz"""
+    pages = {}
+    async with make_client() as client:
+        for url in BOUNDLESS_URLS:
+            resp = await client.get(url)
+            resp.raise_for_status()
+            pages[url] = resp.text
+            print(f"[+] {url}: {len(resp.text)} karakter")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(pages, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f"[+] {len(pages)} sayfa {path} dosyasına yazıldı.")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def evaluate(questions: list, ks: list) -> tuple:
+    max_k = max(ks)
+    timings = {'predefined': [], 'embedding': [], 'documentation': [], 'total': []}
+    rows = []
+
+    # Model ve thread pool ısınsın; ilk sorgunun yükleme süresi ölçüme girmesin
+    await assistant.encode_query(questions[0]['question'])
+
+    for item in questions:
+        question = item['question']
+        normalized_question = question.lower().strip()
+        question_words = set(re.findall(r'\w+', normalized_question))
+
+        start = time.perf_counter()
+        assistant.predefined_router.match(normalized_question, question_words)
+        timings['predefined'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        question_embedding = await assistant.encode_query(question)
+        timings['embedding'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = await assistant.search_documents(question, normalized_question, question_words, top_k=max_k * 4,
+                                                   question_embedding=question_embedding)
+        timings['documentation'].append(time.perf_counter() - start)
+        urls = ranked_urls(results)[:max_k]
+        rank = urls.index(item['source_url']) + 1 if item.get('source_url') in urls else None
+
+        # Uçtan uca yönlendirme; önceki soruların cevabı semantic önbellekten gelmesin
+        assistant.answer_cache.clear()
+        start = time.perf_counter()
+        response, _, _ = await assistant.answer_question(question, normalized_question, question_words)
+        timings['total'].append(time.perf_counter() - start)
+
+        rows.append({
+            'question': question,
+            'expected_url': item.get('source_url'),
+            'expected_stage': item.get('stage'),
+            'stage': response['source'],
+            'answer_url': response['source_url'],
+            'answer_urls': response['source_urls'],
+            'answer_chars': len(response['answer']),
+            'score': response['similarity_score'],
+            'doc_rank': rank,
+            'doc_top_urls': urls,
+            'total_ms': timings['total'][-1] * 1000.0,
+        })
+    return rows, timings
+
+
+def summarize(rows: list, timings: dict, ks: list) -> dict:
+    labeled = [row for row in rows if row['expected_url']]
+    documentation = {
+        'questions': len(labeled),
+        'mrr': float(np.mean([1.0 / row['doc_rank'] if row['doc_rank'] else 0.0 for row in labeled])) if labeled else 0.0,
+    }
+    for k in ks:
+        documentation[f"recall@{k}"] = (
+            float(np.mean([row['doc_rank'] is not None and row['doc_rank'] <= k for row in labeled])) if labeled else 0.0
+        )
+
+    stages = {}
+    for stage in STAGES:
+        answered = [row for row in rows if row['stage'] == stage]
+        # Beklenen URL varsa cevap onu göstermeli; sadece aşama etiketi varsa aşama tutmalı
+        correct = [
+            row for row in answered
+            if (row['expected_url'] and row['answer_url'] == row['expected_url'])
+            or (not row['expected_url'] and row['expected_stage'] == stage)
+        ]
+        stages[stage] = {
+            'answered': len(answered),
+            'rate': len(answered) / len(rows) if rows else 0.0,
+            'correct': len(correct),
+            'precision': len(correct) / len(answered) if answered else None,
+        }
+    expected = [row for row in rows if row['expected_stage']]
+    stages['expected_stage_accuracy'] = (
+        sum(row['stage'] == row['expected_stage'] for row in expected) / len(expected) if expected else None
+    )
+
+    return {
+        'documentation': documentation,
+        'stages': stages,
+        'latency': {name: latency_summary(samples) for name, samples in timings.items()},
+    }
+
+
+def print_report(report: dict, baseline: dict = None):
+    def delta(path):
+        if baseline is None:
+            return ''
+        old, new = baseline, report
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if old is None or new is None:
+            return ''
+        return f" ({new - old:+.3f})"
+
+    documentation = report['documentation']
+    print(f"documentation ({documentation['questions']} labeled questions)")
+    for key, value in documentation.items():
+        if key != 'questions':
+            print(f"  {key:<10} {value:.3f}{delta(['documentation', key])}")
+    print("stages")
+    for stage in STAGES:
+        info = report['stages'][stage]
+        precision = f"{info['precision']:.2f}" if info['precision'] is not None else '-'
+        print(f"  {stage:<14} answered={info['answered']:<3} rate={info['rate']:.2f}{delta(['stages', stage, 'rate'])} "
+              f"correct={info['correct']} precision={precision}")
+    print("latency")
+    for name, info in report['latency'].items():
+        if info['count']:
+            print(f"  {name:<14} p50={info['p50_ms']:.2f}ms{delta(['latency', name, 'p50_ms'])} "
+                  f"p99={info['p99_ms']:.2f}ms{delta(['latency', name, 'p99_ms'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Etiketli soru setiyle offline retrieval/gecikme değerlendirmesi")
+    parser.add_argument('--corpus', default=EVAL_CORPUS_PATH, help="URL -> HTML korpus dosyası")
+    parser.add_argument('--snapshot-corpus', action='store_true', help="Korpusu canlı sayfalardan yenile ve çık")
+    parser.add_argument('--questions', default=EVAL_QUESTIONS_PATH)
+    parser.add_argument('--k', default='1,3,5,10')
+    parser.add_argument('--output', default='', help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument('--baseline', default='', help="Karşılaştırılacak önceki sonuç JSON'u")
+    args = parser.parse_args()
+
+    if args.snapshot_corpus:
+        asyncio.run(snapshot_corpus(args.corpus))
+        return
+
+    ks = sorted({int(k) for k in args.k.split(',')})
+    with open(args.questions, encoding='utf-8') as f:
+        questions = json.load(f)
+    if not os.path.exists(args.corpus):
+        raise SystemExit(f"[!] Korpus bulunamadı: {args.corpus}. Dokümanlara erişilen bir makinede "
+                         f"'python -m app.evaluate --snapshot-corpus' ile üretip repoya ekleyin.")
+    with open(args.corpus, 'rb') as f:
+        corpus_bytes = f.read()
+    pages = json.loads(corpus_bytes)
+
+    index_dir = tempfile.mkdtemp(prefix='boundless-eval-')
+    assistant.search_web = offline_search_web
+    # Koşu boyunca korpus değişmesin: index sadece geçici dizinden, izleme kapalı
+    assistant.INDEX_DIR = index_dir
+    assistant.INDEX_WATCH_INTERVAL = 0
+
+    async def run():
+        store = await build_fixture_index(pages, index_dir)
+        # Servisle aynı açılış yolu; generation yeni yazıldığı için scrape'e düşmez
+        await assistant.warm_up()
+        try:
+            return store, await evaluate(questions, ks)
+        finally:
+            await assistant.embedding_batcher.close()
+
+    try:
+        store, (rows, timings) = asyncio.run(run())
+        generation = current_generation(index_dir, assistant.MODEL_NAME, assistant.CHUNKER_PARAMS)
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+    report = {
+        'meta': {
+            'created_at': time.time(),
+            'git_revision': git_revision(),
+            'model': assistant.MODEL_NAME,
+            'chunker_params': assistant.CHUNKER_PARAMS,
+            'corpus': os.path.relpath(args.corpus),
+            'corpus_sha1': hashlib.sha1(corpus_bytes).hexdigest(),
+            'pages': len(pages),
+            'index': os.path.basename(index_path(index_dir, assistant.MODEL_NAME, assistant.CHUNKER_PARAMS)),
+            'index_generation': generation,
+            'chunks': len(store),
+            'ann_index': assistant.ann_index.name,
+            'questions': len(questions),
+            'k': ks,
+        },
+        **summarize(rows, timings, ks),
+        'questions': rows,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[+] Sonuçlar {args.output} dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Embedding modelini ONNX'e export et ve int8 quantize et (offline)
+
+Kullanım (backend/ dizininden, requirements-onnx.txt kurulu iken):
+    python -m app.export_embedder [--model-dir models] [--quantization avx2]
+
+Çıktı EMBEDDING_BACKEND=onnx ve EMBEDDING_BACKEND=int8 tarafından kullanılır.
+"""
+import argparse
+
+from app.embeddings import (
+    EMBEDDING_MODEL, EMBEDDING_MODEL_DIR, INT8_FILE_SUFFIX, export_path, int8_file_name, require_onnx
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding modelini ONNX/int8 olarak export et")
+    parser.add_argument('--model', default=EMBEDDING_MODEL)
+    parser.add_argument('--model-dir', default=EMBEDDING_MODEL_DIR)
+    parser.add_argument('--quantization', default='avx2', choices=['arm64', 'avx2', 'avx512', 'avx512_vnni'],
+                        help="Hedef CPU'nun komut setine uygun dinamik quantization ayarı")
+    args = parser.parse_args()
+
+    require_onnx()
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    path = export_path(args.model, args.model_dir)
+    # fp32 ONNX: backend="onnx" modeli kaydederken onnx/model.onnx yazılır
+    model = SentenceTransformer(args.model, backend='onnx')
+    model.save(path)
+    print(f"[+] ONNX modeli {path} dizinine yazıldı.")
+
+    export_dynamic_quantized_onnx_model(model, args.quantization, path, file_suffix=INT8_FILE_SUFFIX)
+    print(f"[+] int8 ({args.quantization}) modeli {path}/{int8_file_name()} olarak yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
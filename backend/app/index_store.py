@@ -0,0 +1,170 @@
+"""Diskteki embedding index artifact'ı
+
+Her artifact model adı ve chunker parametrelerinden türetilen bir alt dizindir;
+her yeniden üretim o dizinde yeni bir generation açar:
+    <index_dir>/<model>-<params hash>/CURRENT                  yayındaki generation'ın adı
+    <index_dir>/<model>-<params hash>/gen-<ns>/meta.json       format versiyonu, model, chunker parametreleri
+    <index_dir>/<model>-<params hash>/gen-<ns>/urls.json       tekil URL tablosu
+    <index_dir>/<model>-<params hash>/gen-<ns>/blob.bin        tüm chunk metinleri (UTF-8) art arda
+    <index_dir>/<model>-<params hash>/gen-<ns>/<kolon>.npy     url id, offset, uzunluk, başlık, chunk_id, hash
+    <index_dir>/<model>-<params hash>/gen-<ns>/embeddings.npy  L2-normalize float32 matris
+    <index_dir>/<model>-<params hash>/gen-<ns>/keywords/       CSR ters keyword indeksi
+    <index_dir>/<model>-<params hash>/gen-<ns>/hnsw.bin        HNSW grafı (ANN_INDEX=exact değilse)
+
+Dosyalar ChunkStore, KeywordIndex ve HnswIndex'in save/load'ı ile yazılıp okunur.
+
+Generation'lar yazıldıktan sonra değişmez; yayınlamak CURRENT'ı atomik olarak
+değiştirmektir. Dosyalar read-only mmap ile açıldığından aynı makinedeki uvicorn
+worker'ları metni ve vektörleri page cache üzerinden paylaşır; CURRENT'ı izleyen
+worker'lar yeni generation'a geçerken eski mmap'ler üzerindeki istekler biter.
+Son BOUNDLESS_INDEX_KEEP_GENERATIONS generation diskte tutulur.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Optional
+
+from app.ann import HnswIndex, build_ann_index, load_ann_index
+from app.chunk_store import ChunkStore
+from app.keywords import KeywordIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: build kilidi yok
+    fcntl = None
+
+INDEX_FORMAT_VERSION = 4
+INDEX_DIR = os.getenv('BOUNDLESS_INDEX_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'index'))
+# 0 = artifact yaşı kontrol edilmez
+INDEX_MAX_AGE = int(os.getenv('BOUNDLESS_INDEX_MAX_AGE', '0'))
+INDEX_KEEP_GENERATIONS = max(1, int(os.getenv('BOUNDLESS_INDEX_KEEP_GENERATIONS', '2')))
+
+META_FILE = 'meta.json'
+CURRENT_FILE = 'CURRENT'
+KEYWORDS_DIR = 'keywords'
+GENERATION_PREFIX = 'gen-'
+LOCK_FILE = '.build.lock'
+
+
+def index_path(index_dir: str, model_name: str, chunk_params: dict) -> str:
+    """Model ve chunker parametrelerine göre artifact dizinini döndür"""
+    params_hash = hashlib.sha1(json.dumps(chunk_params, sort_keys=True).encode()).hexdigest()[:12]
+    safe_model = model_name.replace('/', '_')
+    return os.path.join(index_dir, f"{safe_model}-{params_hash}")
+
+
+def current_generation(index_dir: str, model_name: str, chunk_params: dict) -> Optional[str]:
+    """Yayındaki generation'ın adı; hiç yayınlanmadıysa None"""
+    try:
+        with open(os.path.join(index_path(index_dir, model_name, chunk_params), CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def acquire_build_lock(index_dir: str):
+    """Aynı index dizinini paylaşan süreçler arasında tek üretici (worker'lar aynı anda scrape etmesin); bloklar"""
+    os.makedirs(index_dir, exist_ok=True)
+    lock = open(os.path.join(index_dir, LOCK_FILE), 'a')
+    if fcntl is not None:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def release_build_lock(lock):
+    if fcntl is not None:
+        fcntl.flock(lock, fcntl.LOCK_UN)
+    lock.close()
+
+
+def save_index(index_dir: str, store: ChunkStore, model_name: str, chunk_params: dict,
+               keyword_index: Optional[KeywordIndex] = None, ann_index=None) -> str:
+    """Yeni generation'ı yaz, CURRENT'ı atomik olarak ona çevir ve eski generation'ları temizle"""
+    root = index_path(index_dir, model_name, chunk_params)
+    os.makedirs(root, exist_ok=True)
+    generation = f"{GENERATION_PREFIX}{time.time_ns()}"
+    path = os.path.join(root, generation)
+    tmp_path = os.path.join(root, f".tmp-{generation}-{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    store.save(tmp_path)
+    (keyword_index or KeywordIndex(list(store.texts()))).save(os.path.join(tmp_path, KEYWORDS_DIR))
+    ann_index = ann_index or build_ann_index(store.embeddings, store.eligible_mask())
+    if isinstance(ann_index, HnswIndex):
+        ann_index.save(tmp_path)
+    meta = {
+        'version': INDEX_FORMAT_VERSION,
+        'model': model_name,
+        'chunk_params': chunk_params,
+        'generation': generation,
+        'ann_index': ann_index.name,
+        'chunks': len(store),
+        'urls': len(store.urls),
+        'dim': int(store.embeddings.shape[1]) if store.embeddings.ndim == 2 else 0,
+        'created_at': time.time(),
+    }
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.rename(tmp_path, path)
+
+    # Yayınla: okuyucular ya eski ya yeni adı görür
+    pointer_tmp = os.path.join(root, f".{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(generation)
+    os.replace(pointer_tmp, os.path.join(root, CURRENT_FILE))
+
+    # Eski generation'ları açık tutan worker'lar etkilenmez: silinen dosyalar mmap kapanana kadar yaşar
+    generations = sorted(
+        (name for name in os.listdir(root) if name.startswith(GENERATION_PREFIX)),
+        key=lambda name: int(name[len(GENERATION_PREFIX):]),
+    )
+    for name in generations[:-INDEX_KEEP_GENERATIONS]:
+        if name != generation:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return path
+
+
+def load_index(index_dir: str, model_name: str, chunk_params: dict, max_age: int = INDEX_MAX_AGE) -> Optional[tuple]:
+    """Yayındaki generation'ı aç: (ChunkStore, KeywordIndex, ANN index); yoksa, bozuksa veya eskiyse None"""
+    generation = current_generation(index_dir, model_name, chunk_params)
+    if generation is None:
+        return None
+    path = os.path.join(index_path(index_dir, model_name, chunk_params), generation)
+    try:
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != INDEX_FORMAT_VERSION or meta.get('model') != model_name:
+        print(f"Index at {path} is stale (version/model mismatch)")
+        return None
+    if meta.get('chunk_params') != chunk_params:
+        print(f"Index at {path} is stale (chunker parameters changed)")
+        return None
+    if not meta.get('chunks'):
+        print(f"Index at {path} is empty")
+        return None
+    if max_age and time.time() - meta.get('created_at', 0) > max_age:
+        print(f"Index at {path} is older than {max_age}s")
+        return None
+
+    try:
+        store = ChunkStore.load(path)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Index at {path} could not be read: {e}")
+        return None
+    store.built_at = meta.get('created_at', store.built_at)
+    store.generation = generation
+
+    try:
+        keyword_index = KeywordIndex.load(os.path.join(path, KEYWORDS_DIR))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Keyword index at {path} could not be read ({e}), rebuilding")
+        keyword_index = KeywordIndex(list(store.texts()))
+    if keyword_index.size != len(store):
+        keyword_index = KeywordIndex(list(store.texts()))
+    return store, keyword_index, load_ann_index(path, store.embeddings, store.eligible_mask())
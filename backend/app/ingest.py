@@ -0,0 +1,274 @@
+"""Ortak, eşzamanlı scraping/ingestion pipeline'ı
+
+Sayfalar paylaşılan bir httpx.AsyncClient ile sınırlı paralellikte çekilir,
+HTML bir process pool'da parse edilir ve chunk'lar, diğer sayfalar hâlâ
+inerken embedding batch'lerine akıtılır. main.py, load_docs.py ve
+load_docs_postgres.py bu modülü kullanır.
+
+Incremental refresh için ingest() önceki ETag/Last-Modified değerleriyle
+koşullu GET atar, sayfa ve chunk içerik hash'lerini hesaplar ve sadece
+değişen chunk'ları embedding'e gönderir; sayfa sonuçları `pages` içine yazılır.
+
+Offline test için ingest()'e yerel bir HTTP sunucusuna giden URL'ler veya
+kendi transport'u olan bir client verilebilir.
+"""
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import httpx
+import numpy as np
+from bs4 import BeautifulSoup, Comment
+
+BOUNDLESS_URLS = [
+    # Ana sayfa ve temel dokümantasyon
+    'https://beboundless.xyz/',
+    'https://docs.beboundless.xyz/developers/what',
+    'https://docs.beboundless.xyz/developers/proof-lifecycle',
+    'https://docs.beboundless.xyz/developers/why',
+    'https://docs.beboundless.xyz/developers/core-concepts',
+
+    # Ecosystem - 25+ protokol entegrasyonu
+    'https://beboundless.xyz/ecosystem',
+
+    # Blog - güncel gelişmeler ve teknik yazılar
+    'https://beboundless.xyz/blog',
+
+    # Prover dokümantasyonu - node çalıştırma
+    'https://docs.beboundless.xyz/provers/quick-start',
+    'https://docs.beboundless.xyz/provers/who-should-run',
+    'https://docs.beboundless.xyz/provers/requirements',
+
+    # Ek teknik dokümanlar
+    'https://docs.beboundless.xyz/developers/quick-start',
+    'https://docs.beboundless.xyz/developers/build-a-program',
+    'https://docs.beboundless.xyz/developers/request-a-proof',
+    'https://docs.beboundless.xyz/developers/use-a-proof',
+
+    # Whitepaper ve teknik dökümanlar
+    'https://read.beboundless.xyz/',
+]
+
+FETCH_CONCURRENCY = int(os.getenv('INGEST_CONCURRENCY', '8'))
+FETCH_TIMEOUT = float(os.getenv('INGEST_FETCH_TIMEOUT', '15'))
+PARSE_WORKERS = int(os.getenv('INGEST_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+EMBED_BATCH_SIZE = int(os.getenv('INGEST_EMBED_BATCH_SIZE', '64'))
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# İç içe geçtiğinde metni tekrar ettiren blok etiketleri
+BLOCK_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'div', 'ul', 'ol', 'section', 'article', 'table']
+
+
+def block_texts(soup: BeautifulSoup, tags: List[str]) -> List[str]:
+    """Etiketlerin metinleri, iç içe bloklar ve tekrar eden metinler bir kez
+
+    <div><div><p>x</p></div></div> eskiden x'i üç kez üretiyordu. İçinde blok olan
+    kapsayıcılardan sadece kendi (blok dışı) metni alınır, blokların metni kendi
+    etiketlerinden gelir.
+    """
+    texts = []
+    seen = set()
+    for tag in soup.find_all(tags):
+        if tag.find(BLOCK_TAGS) is not None:
+            txt = ''.join(
+                child.strip() if isinstance(child, str) else child.get_text(strip=True)
+                for child in tag.children
+                if not isinstance(child, Comment) and (isinstance(child, str) or child.name not in BLOCK_TAGS)
+            )
+        else:
+            txt = tag.get_text(strip=True)
+        if txt and txt not in seen:
+            seen.add(txt)
+            texts.append(txt)
+    return texts
+
+
+def extract_page_text(html: str) -> str:
+    """main.py için: başlıklar 'Title:' önekiyle, ardından p/li/div metinleri (blok başına bir satır)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    texts = []
+
+    # Başlıkları al
+    for txt in block_texts(soup, ['h1', 'h2', 'h3', 'h4', 'h5']):
+        if len(txt) > 5 and len(txt) < 200:
+            texts.append(f"Title: {txt}")
+
+    # Paragrafları al
+    for txt in block_texts(soup, ['p', 'li', 'div']):
+        if len(txt) > 20 and len(txt) < 1000:  # Daha uzun metinler
+            texts.append(txt)
+
+    return '\n'.join(texts)
+
+
+def extract_text(html: str) -> str:
+    """Loader'lar için: sadece ana içerik metni (h1-h4, p, li), satır satır"""
+    soup = BeautifulSoup(html, 'html.parser')
+    return '\n'.join(block_texts(soup, ['h1', 'h2', 'h3', 'h4', 'p', 'li']))
+
+
+def content_hash(text: str) -> str:
+    """Metnin içerik hash'i (chunk ve sayfa kimliği için)"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def make_client(concurrency: int = FETCH_CONCURRENCY) -> httpx.AsyncClient:
+    """Bağlantı havuzlu, paylaşılan HTTP client"""
+    return httpx.AsyncClient(
+        timeout=FETCH_TIMEOUT,
+        follow_redirects=True,
+        headers={'User-Agent': USER_AGENT},
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+
+async def _process_url(url, client, semaphore, pool, extract, chunk, queue, known):
+    """Sayfayı (koşullu) çek, process pool'da parse et, chunk'ları kuyruğa koy
+
+    Sayfa durumu: 'fetched', 'not_modified' (304), 'unchanged' (aynı metin hash'i) veya 'error'.
+    """
+    chunks = []
+    page = {'status': 'error', 'etag': known.get('etag'), 'last_modified': known.get('last_modified'),
+            'page_hash': known.get('page_hash')}
+    try:
+        headers = {}
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+        async with semaphore:
+            print(f"Fetching: {url}")
+            resp = await client.get(url, headers=headers)
+            if resp.status_code == 304:
+                page['status'] = 'not_modified'
+                print(f"[=] {url}: not modified")
+                await queue.put((url, chunks, page))
+                return
+            resp.raise_for_status()
+            html = resp.text
+        page['etag'] = resp.headers.get('etag')
+        page['last_modified'] = resp.headers.get('last-modified')
+        # Parse işlemi semaphore dışında - bu sırada diğer sayfalar inmeye devam eder
+        text = await asyncio.get_running_loop().run_in_executor(pool, extract, html)
+        page_hash = content_hash(text)
+        if page_hash == known.get('page_hash'):
+            page['status'] = 'unchanged'
+            print(f"[=] {url}: content unchanged")
+        else:
+            page['status'] = 'fetched'
+            page['page_hash'] = page_hash
+            chunks = chunk(text)
+            print(f"[+] {url}: {len(chunks)} chunks")
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+    await queue.put((url, chunks, page))
+
+
+async def ingest(
+    urls: List[str],
+    extract: Callable[[str], str],
+    chunk: Callable[[str], List[str]],
+    embed: Optional[Callable[[List[str]], np.ndarray]] = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = FETCH_CONCURRENCY,
+    client: Optional[httpx.AsyncClient] = None,
+    validators: Optional[dict] = None,
+    skip: Optional[Callable[[dict], bool]] = None,
+    pages: Optional[dict] = None,
+):
+    """(records, embeddings) batch'leri üreten async generator
+
+    records: [{'content', 'url', 'chunk_id', 'hash'}], embeddings: embed(texts)
+    sonucu (embed verilmezse None). extract process pool'da çalıştığı için
+    modül seviyesinde tanımlı bir fonksiyon olmalı.
+
+    validators: url -> {'etag', 'last_modified', 'page_hash'} (önceki refresh'ten)
+    skip: True döndürdüğü kayıtlar (ör. hash'i zaten indekste olanlar) embed edilmez/yield edilmez
+    pages: verilirse url -> sayfa durumu + 'chunk_hashes' ve 'chunk_positions' (hash -> chunk_id,
+           sayfadaki güncel sıra; atlanan bilinen chunk'lar dahil) ile doldurulur
+    """
+    validators = validators or {}
+    own_client = client is None
+    if own_client:
+        client = make_client(concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue()
+    pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    tasks = [
+        asyncio.create_task(_process_url(url, client, semaphore, pool, extract, chunk, queue, validators.get(url, {})))
+        for url in urls
+    ]
+
+    async def flush(batch):
+        if embed is None:
+            return batch, None
+        # Embedding thread'de çalışır, event loop indirmelere devam eder
+        embeddings = await asyncio.to_thread(embed, [record['content'] for record in batch])
+        return batch, embeddings
+
+    try:
+        batch = []
+        for _ in range(len(tasks)):
+            url, chunks, page = await queue.get()
+            seen = {}
+            for i, content in enumerate(chunks):
+                record = {'content': content, 'url': url, 'chunk_id': i, 'hash': content_hash(content)}
+                # Aynı sayfadaki birebir tekrar eden chunk'lar tek kayıt
+                if record['hash'] in seen:
+                    continue
+                seen[record['hash']] = i
+                if skip is not None and skip(record):
+                    continue
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield await flush(batch)
+                    batch = []
+            if pages is not None:
+                page['chunk_hashes'] = list(seen)
+                page['chunk_positions'] = seen
+                pages[url] = page
+        if batch:
+            yield await flush(batch)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        pool.shutdown(wait=False, cancel_futures=True)
+        if own_client:
+            await client.aclose()
+
+
+def run_ingestion(urls, extract, chunk, embed=None, on_batch=None, **kwargs):
+    """Senkron çağıranlar (loader CLI'ları) için: her batch'te on_batch(records, embeddings) çağır"""
+    async def _run():
+        async for records, embeddings in ingest(urls, extract, chunk, embed=embed, **kwargs):
+            if on_batch is not None:
+                # Yazma işlemi thread'de - bu sırada diğer sayfalar inmeye devam eder
+                await asyncio.to_thread(on_batch, records, embeddings)
+
+    asyncio.run(_run())
+
+
+def diff_pages(pages: dict, existing: dict, added: int) -> tuple:
+    """Refresh sonrası silinecek chunk hash'lerini ve istatistikleri hesapla
+
+    existing: url -> indeksteki chunk hash'leri. Hatalı, 304 dönen veya metni
+    değişmeyen sayfaların chunk'ları korunur; listeden çıkarılan URL'lerin
+    chunk'ları silinir. Döndürür: (url -> silinecek hash set'i, {'skipped', 'added', 'removed'})
+    """
+    removed = {}
+    skipped = 0
+    for url, old_hashes in existing.items():
+        page = pages.get(url)
+        if page is None:
+            removed[url] = set(old_hashes)
+        elif page['status'] == 'fetched':
+            new_hashes = set(page['chunk_hashes'])
+            removed[url] = set(old_hashes) - new_hashes
+            skipped += len(set(old_hashes) & new_hashes)
+        else:
+            skipped += len(old_hashes)
+    stats = {'skipped': skipped, 'added': added, 'removed': sum(len(h) for h in removed.values())}
+    return {url: hashes for url, hashes in removed.items() if hashes}, stats
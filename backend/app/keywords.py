@@ -0,0 +1,177 @@
+"""Hibrit skorun lexical yarısı için ters indeks (term -> chunk id posting listesi)
+
+Tokenizasyon ingest sırasında bir kez yapılır. Sorgu anında keyword_overlap
+posting listelerinden, special_keywords bonusu ise önceden hesaplanmış
+chunk x özel kelime matrisinden vektörel olarak hesaplanır. KEYWORD_SCORING=bm25
+ile ham örtüşme sayısı yerine BM25 skoru kullanılır.
+
+Posting listeleri CSR düzenindedir (terim -> indptr aralığı, art arda ids/tfs);
+index artifact'ına yazılıp worker'larda mmap ile açılabilir (save/load).
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+KEYWORD_SCORING = os.getenv('KEYWORD_SCORING', 'overlap')
+BM25_K1 = float(os.getenv('BM25_K1', '1.5'))
+BM25_B = float(os.getenv('BM25_B', '0.75'))
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Özel kelime eşleşmeleri (hem hazır sorular hem doküman araması için)
+SPECIAL_KEYWORDS = {
+    'boundless': 3,
+    'proof': 2,
+    'lifecycle': 2,
+    'prover': 2,
+    'node': 2,
+    'zk': 2,
+    'mining': 2,
+    'sdk': 2,
+    'ecosystem': 2,
+    'security': 2,
+    'tokenomics': 3,
+    'token': 2,
+    'zkc': 3
+}
+SPECIAL_WORDS = list(SPECIAL_KEYWORDS)
+SPECIAL_WEIGHTS = np.array([SPECIAL_KEYWORDS[word] for word in SPECIAL_WORDS], dtype=np.float64)
+
+TERMS_FILE = 'terms.json'
+ARRAYS = ('indptr', 'posting_ids', 'posting_tfs', 'doc_lengths', 'special')
+
+
+def tokenize(text: str) -> set:
+    """Metnin küçük harfli kelime kümesi"""
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def active_special_keywords(normalized_question: str) -> np.ndarray:
+    """Soruda (substring olarak) geçen özel kelimelerin maskesi"""
+    return np.array([word in normalized_question for word in SPECIAL_WORDS], dtype=bool)
+
+
+class KeywordIndex:
+    """Chunk metinleri üzerinde ters indeks + özel kelime matrisi"""
+
+    def __init__(self, texts: List[str]):
+        self.size = len(texts)
+        postings = {}
+        doc_lengths = np.zeros(self.size, dtype=np.float64)
+        # Özel kelimeler substring olarak eşleşir ('zk' -> 'zkvm'), bu yüzden token değil metin üzerinden
+        self.special = np.zeros((self.size, len(SPECIAL_WORDS)), dtype=bool)
+
+        for i, text in enumerate(texts):
+            lowered = text.lower()
+            tokens = TOKEN_RE.findall(lowered)
+            doc_lengths[i] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(tf)
+            for j, word in enumerate(SPECIAL_WORDS):
+                self.special[i, j] = word in lowered
+
+        self.terms = {term: k for k, term in enumerate(postings)}
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(ids) for ids, _ in postings.values()])
+        self.posting_ids = np.array([i for ids, _ in postings.values() for i in ids], dtype=np.int32)
+        self.posting_tfs = np.array([tf for _, tfs in postings.values() for tf in tfs], dtype=np.float64)
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = float(doc_lengths.mean()) if self.size else 0.0
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, TERMS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'special_words': SPECIAL_WORDS, 'terms': list(self.terms)}, f, ensure_ascii=False)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str, mmap_arrays: bool = True) -> 'KeywordIndex':
+        """save() ile yazılmış indeksi aç; SPECIAL_KEYWORDS değiştiyse ValueError"""
+        with open(os.path.join(path, TERMS_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['special_words'] != SPECIAL_WORDS:
+            raise ValueError("special keywords changed")
+        index = cls.__new__(cls)
+        for name in ARRAYS:
+            setattr(index, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap_arrays else None))
+        index.terms = {term: k for k, term in enumerate(meta['terms'])}
+        index.size = len(index.doc_lengths)
+        index.avg_doc_length = float(index.doc_lengths.mean()) if index.size else 0.0
+        if len(index.indptr) != len(index.terms) + 1 or index.special.shape != (index.size, len(SPECIAL_WORDS)):
+            raise ValueError(f"keyword index arrays do not match {len(index.terms)} terms / {index.size} chunks")
+        return index
+
+    def posting(self, word: str):
+        """(chunk ids, term frekansları) veya terim yoksa None"""
+        k = self.terms.get(word)
+        if k is None:
+            return None
+        start, end = self.indptr[k], self.indptr[k + 1]
+        return self.posting_ids[start:end], self.posting_tfs[start:end]
+
+    def candidate_tfs(self, word: str, ids: np.ndarray):
+        """ids sırasıyla terimin frekansları (chunk'ta yoksa 0) veya terim hiç yoksa None"""
+        posting = self.posting(word)
+        if posting is None:
+            return None
+        posting_ids, tfs = posting
+        # Posting listeleri chunk sırasıyla kurulur, ikili arama yeterli
+        positions = np.minimum(np.searchsorted(posting_ids, ids), len(posting_ids) - 1)
+        return np.where(posting_ids[positions] == ids, tfs[positions], 0.0)
+
+    def overlap(self, question_words: set, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Her chunk (ids verilirse sadece o adaylar) için len(question_words & chunk_words)"""
+        scores = np.zeros(self.size if ids is None else len(ids), dtype=np.float64)
+        for word in question_words:
+            if ids is not None:
+                tfs = self.candidate_tfs(word, ids)
+                if tfs is not None:
+                    scores += tfs > 0
+                continue
+            posting = self.posting(word)
+            if posting is not None:
+                scores[posting[0]] += 1
+        return scores
+
+    def bm25(self, question_words: set, ids: Optional[np.ndarray] = None,
+             k1: float = BM25_K1, b: float = BM25_B) -> np.ndarray:
+        """Her chunk (ids verilirse sadece o adaylar) için Okapi BM25 skoru; idf tüm korpustan"""
+        scores = np.zeros(self.size if ids is None else len(ids), dtype=np.float64)
+        if not self.size:
+            return scores
+        doc_lengths = self.doc_lengths if ids is None else self.doc_lengths[ids]
+        length_norm = k1 * (1 - b + b * doc_lengths / max(self.avg_doc_length, 1e-9))
+        for word in question_words:
+            posting = self.posting(word)
+            if posting is None:
+                continue
+            posting_ids, tfs = posting
+            idf = np.log(1 + (self.size - len(posting_ids) + 0.5) / (len(posting_ids) + 0.5))
+            if ids is None:
+                scores[posting_ids] += idf * tfs * (k1 + 1) / (tfs + length_norm[posting_ids])
+            else:
+                tfs = self.candidate_tfs(word, ids)
+                scores += idf * tfs * (k1 + 1) / (tfs + length_norm)
+        return scores
+
+    def keyword_scores(self, question_words: set, mode: str = KEYWORD_SCORING,
+                       ids: Optional[np.ndarray] = None) -> np.ndarray:
+        if mode == 'bm25':
+            return self.bm25(question_words, ids)
+        return self.overlap(question_words, ids)
+
+    def special_bonus(self, normalized_question: str, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Her chunk (ids verilirse sadece o adaylar) için hem soruda hem chunk'ta geçen özel kelimelerin ağırlık toplamı"""
+        size = self.size if ids is None else len(ids)
+        active = active_special_keywords(normalized_question)
+        if not active.any() or not size:
+            return np.zeros(size, dtype=np.float64)
+        special = self.special if ids is None else self.special[ids]
+        return special[:, active] @ SPECIAL_WEIGHTS[active]
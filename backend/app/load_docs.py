@@ -1,87 +1,99 @@
-import requests
-from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer
 import chromadb
-import re
 import numpy as np
+from app.chunking import CHUNK_OVERLAP_TOKENS, Chunker
+from app.embeddings import EMBEDDING_MODEL, load_embedder
+from app.ingest import BOUNDLESS_URLS, diff_pages, extract_text, run_ingestion
 
-def fetch_text_from_url(url):
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
-    # Sadece ana içerik metnini çek (örnek: tüm <p> ve <h*> tag'leri)
-    texts = []
-    for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'li']):
-        txt = tag.get_text(strip=True)
-        if txt:
-            texts.append(txt)
-    return '\n'.join(texts)
+# Chunk boyutu (token, ~40 kelime); 6 kelimeden kısa chunk'lar atlanır
+CHUNK_MAX_TOKENS = 64
+CHUNK_MIN_WORDS = 6
 
-def chunk_text(text, max_tokens=40):
-    # Basit cümle bazlı chunking (daha küçük parçalara bölecek)
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    chunks = []
-    chunk = ''
-    for sent in sentences:
-        if len((chunk + sent).split()) > max_tokens:
-            chunks.append(chunk.strip())
-            chunk = sent
-        else:
-            chunk += ' ' + sent
-    if chunk:
-        chunks.append(chunk.strip())
-    return [c for c in chunks if len(c.split()) > 5]  # çok kısa chunk'ları atla
+def chunk_key(url, chunk_hash):
+    return f"{url}_chunk_{chunk_hash}"
+
+def load_existing(collection):
+    """İndeksteki chunk'ları url -> {hash: id} ve sayfa doğrulayıcıları olarak döndür"""
+    existing = {}
+    validators = {}
+    result = collection.get(include=['metadatas'])
+    for chunk_id, meta in zip(result['ids'], result['metadatas']):
+        meta = meta or {}
+        url = meta.get('url', '')
+        # hash metadata'sı olmayan eski kayıtlar bir sonraki refresh'te silinir
+        existing.setdefault(url, {})[meta.get('hash') or chunk_id] = chunk_id
+        if meta.get('page_hash'):
+            validators[url] = {
+                'etag': meta.get('etag') or None,
+                'last_modified': meta.get('last_modified') or None,
+                'page_hash': meta['page_hash'],
+            }
+    return existing, validators
+
+def page_metadata(page):
+    return {
+        'etag': page.get('etag') or '',
+        'last_modified': page.get('last_modified') or '',
+        'page_hash': page.get('page_hash') or '',
+    }
 
 def main():
-    urls = [
-        # Ana sayfa ve temel dokümantasyon
-        'https://beboundless.xyz/',
-        'https://docs.beboundless.xyz/developers/what',
-        'https://docs.beboundless.xyz/developers/proof-lifecycle',
-        'https://docs.beboundless.xyz/developers/why',
-        'https://docs.beboundless.xyz/developers/core-concepts',
-        
-        # Ecosystem - 25+ protokol entegrasyonu
-        'https://beboundless.xyz/ecosystem',
-        
-        # Blog - güncel gelişmeler ve teknik yazılar
-        'https://beboundless.xyz/blog',
-        
-        # Prover dokümantasyonu - node çalıştırma
-        'https://docs.beboundless.xyz/provers/quick-start',
-        'https://docs.beboundless.xyz/provers/who-should-run',
-        'https://docs.beboundless.xyz/provers/requirements',
-        
-        # Ek teknik dokümanlar
-        'https://docs.beboundless.xyz/developers/quick-start',
-        'https://docs.beboundless.xyz/developers/build-a-program',
-        'https://docs.beboundless.xyz/developers/request-a-proof',
-        'https://docs.beboundless.xyz/developers/use-a-proof',
-        
-        # Whitepaper ve teknik dökümanlar
-        'https://read.beboundless.xyz/',
-    ]
-    embedder = SentenceTransformer('all-MiniLM-L6-v2')
+    embedder = load_embedder()
+    chunk_text = Chunker(CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, min_words=CHUNK_MIN_WORDS,
+                         tokenizer=lambda: embedder.tokenizer, tokenizer_name=EMBEDDING_MODEL)
     chroma_client = chromadb.HttpClient(host="chroma", port=8000)
     collection = chroma_client.get_or_create_collection('boundless_docs')
-    all_ids = collection.get()['ids']
-    if all_ids:
-        collection.delete(ids=all_ids)
-    for url in urls:
-        print(f"[+] {url} çekiliyor...")
-        text = fetch_text_from_url(url)
-        chunks = chunk_text(text)
-        print(f"[+] {len(chunks)} adet chunk bulundu.")
-        embeddings = embedder.encode(chunks)
-        embeddings = np.array(embeddings, dtype=np.float32)
-        for i, chunk in enumerate(chunks):
-            meta = {"url": url, "chunk_id": i}
-            collection.add(
-                documents=[chunk],
-                embeddings=[embeddings[i]],
-                metadatas=[meta],
-                ids=[f"{url}_chunk_{i}"]
+    existing, validators = load_existing(collection)
+    pages = {}
+    added = 0
+
+    def embed(chunks):
+        return np.array(embedder.encode(chunks), dtype=np.float32)
+
+    def is_known(record):
+        return record['hash'] in existing.get(record['url'], {})
+
+    def store_batch(records, embeddings):
+        nonlocal added
+        # Önce yeni chunk'lar eklenir, silme en sonda - indeks hiçbir an boş kalmaz
+        collection.upsert(
+            documents=[r['content'] for r in records],
+            embeddings=embeddings.tolist(),
+            metadatas=[{"url": r['url'], "chunk_id": r['chunk_id'], "hash": r['hash']} for r in records],
+            ids=[chunk_key(r['url'], r['hash']) for r in records]
+        )
+        added += len(records)
+        print(f"[+] {len(records)} chunk için embedding ve kayıt tamamlandı.")
+
+    run_ingestion(BOUNDLESS_URLS, extract_text, chunk_text, embed=embed, on_batch=store_batch,
+                  validators=validators, skip=is_known, pages=pages)
+
+    removed, stats = diff_pages(pages, {url: set(hashes) for url, hashes in existing.items()}, added)
+    remove_ids = [existing[url][h] for url, hashes in removed.items() for h in hashes]
+    if remove_ids:
+        collection.delete(ids=remove_ids)
+
+    # Sayfa doğrulayıcılarını (ETag/Last-Modified/hash) o sayfanın chunk metadata'sına yaz;
+    # değişen sayfalarda korunan chunk'ların chunk_id'si de sayfadaki yeni konumuna çekilir
+    for url, page in pages.items():
+        if page['status'] not in ('fetched', 'unchanged'):
+            continue
+        positions = {}
+        if page['status'] == 'fetched':
+            positions = {chunk_key(url, h): {'chunk_id': i} for h, i in page['chunk_positions'].items()}
+            ids = list(positions)
+        else:
+            ids = list(existing.get(url, {}).values())
+        if ids:
+            current = collection.get(ids=ids, include=['metadatas'])
+            collection.update(
+                ids=current['ids'],
+                metadatas=[
+                    {**(meta or {}), **page_metadata(page), **positions.get(key, {})}
+                    for key, meta in zip(current['ids'], current['metadatas'])
+                ]
             )
-        print(f"[+] {url} için embedding ve kayıt tamamlandı.")
+
+    print(f"[+] Refresh tamamlandı: {stats['skipped']} atlandı, {stats['added']} eklendi, {stats['removed']} silindi.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,41 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer
 import psycopg2
-from psycopg2.extras import RealDictCursor
-import re
+from psycopg2.extras import RealDictCursor, execute_values
+from pgvector.psycopg2 import register_vector
 import numpy as np
 import os
+from app.chunking import CHUNK_OVERLAP_TOKENS, Chunker
+from app.embeddings import EMBEDDING_MODEL, load_embedder
+from app.ingest import BOUNDLESS_URLS, diff_pages, extract_text, run_ingestion
 
-def fetch_text_from_url(url):
-    try:
-        resp = requests.get(url, timeout=10)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        # Sadece ana içerik metnini çek
-        texts = []
-        for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'li']):
-            txt = tag.get_text(strip=True)
-            if txt:
-                texts.append(txt)
-        return '\n'.join(texts)
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return ""
+# Kaç satırda bir staging tablosuna yazılıp commit edileceği
+PG_BATCH_SIZE = int(os.getenv('PG_BATCH_SIZE', '500'))
+# Yükleme sonrası kurulacak ANN index tipi: hnsw veya ivfflat
+PG_VECTOR_INDEX = os.getenv('PG_VECTOR_INDEX', 'hnsw')
 
-def chunk_text(text, max_tokens=120):
-    # Daha büyük chunk'lar oluştur
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    chunks = []
-    chunk = ''
-    for sent in sentences:
-        if len((chunk + sent).split()) > max_tokens:
-            chunks.append(chunk.strip())
-            chunk = sent
-        else:
-            chunk += ' ' + sent
-    if chunk:
-        chunks.append(chunk.strip())
-    return [c for c in chunks if len(c.split()) > 8]  # Minimum kelime sayısını artır
+# Daha büyük chunk'lar (token, ~120 kelime); 9 kelimeden kısa chunk'lar atlanır
+CHUNK_MAX_TOKENS = 160
+CHUNK_MIN_WORDS = 9
 
 def setup_database():
     database_url = os.getenv('DATABASE_URL', 'postgresql://localhost/boundless')
@@ -56,80 +35,170 @@ def setup_database():
         );
     """)
     
-    # Eski verileri temizle
-    cursor.execute("DELETE FROM boundless_chunks;")
+    # Incremental refresh için chunk hash'i ve sayfa doğrulayıcıları
+    cursor.execute("ALTER TABLE boundless_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;")
+    cursor.execute("ALTER TABLE boundless_chunks ADD COLUMN IF NOT EXISTS chunk_id INTEGER;")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS boundless_pages (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            page_hash TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    # Yeni chunk'lar önce buraya batch'ler halinde yazılır, sonra tek transaction'da canlı tabloya taşınır
+    cursor.execute("""
+        CREATE UNLOGGED TABLE IF NOT EXISTS boundless_chunks_staging (
+            content TEXT NOT NULL,
+            url TEXT NOT NULL,
+            embedding vector(384),
+            content_hash TEXT,
+            chunk_id INTEGER
+        );
+    """)
+    cursor.execute("TRUNCATE boundless_chunks_staging;")
     
     conn.commit()
     cursor.close()
     conn.close()
     print("Database setup completed")
 
-def main():
-    urls = [
-        # Ana sayfa ve temel dokümantasyon
-        'https://beboundless.xyz/',
-        'https://docs.beboundless.xyz/developers/what',
-        'https://docs.beboundless.xyz/developers/proof-lifecycle',
-        'https://docs.beboundless.xyz/developers/why',
-        'https://docs.beboundless.xyz/developers/core-concepts',
-        
-        # Ecosystem - 25+ protokol entegrasyonu
-        'https://beboundless.xyz/ecosystem',
-        
-        # Blog - güncel gelişmeler ve teknik yazılar
-        'https://beboundless.xyz/blog',
-        
-        # Prover dokümantasyonu - node çalıştırma
-        'https://docs.beboundless.xyz/provers/quick-start',
-        'https://docs.beboundless.xyz/provers/who-should-run',
-        'https://docs.beboundless.xyz/provers/requirements',
-        
-        # Ek teknik dokümanlar
-        'https://docs.beboundless.xyz/developers/quick-start',
-        'https://docs.beboundless.xyz/developers/build-a-program',
-        'https://docs.beboundless.xyz/developers/request-a-proof',
-        'https://docs.beboundless.xyz/developers/use-a-proof',
-        
-        # Whitepaper ve teknik dökümanlar
-        'https://read.beboundless.xyz/',
-    ]
+def load_existing(cursor):
+    """İndeksteki chunk'ları url -> {hash: id} ve sayfa doğrulayıcıları olarak döndür"""
+    existing = {}
+    cursor.execute("SELECT id, url, content_hash FROM boundless_chunks;")
+    for row_id, url, chunk_hash in cursor.fetchall():
+        # hash'i olmayan eski kayıtlar bir sonraki refresh'te silinir
+        existing.setdefault(url, {})[chunk_hash or f"id:{row_id}"] = row_id
     
+    cursor.execute("SELECT url, etag, last_modified, page_hash FROM boundless_pages;")
+    validators = {
+        url: {'etag': etag, 'last_modified': last_modified, 'page_hash': page_hash}
+        for url, etag, last_modified, page_hash in cursor.fetchall()
+    }
+    return existing, validators
+
+def write_rows(conn, table, rows, page_size=PG_BATCH_SIZE):
+    """(content, url, embedding, content_hash, chunk_id) satırlarını execute_values ile yaz ve commit et"""
+    with conn.cursor() as cursor:
+        execute_values(
+            cursor,
+            f"INSERT INTO {table} (content, url, embedding, content_hash, chunk_id) VALUES %s",
+            rows,
+            page_size=page_size
+        )
+    conn.commit()
+
+def create_vector_index(cursor, index_type=PG_VECTOR_INDEX):
+    """Yükleme bittikten sonra embedding üzerine ANN index kur (varsa dokunma)"""
+    if index_type == 'ivfflat':
+        # IVFFlat listeleri mevcut veriden öğrenir, bu yüzden veri yüklendikten sonra kurulmalı
+        cursor.execute("SELECT count(*) FROM boundless_chunks;")
+        lists = max(1, cursor.fetchone()[0] // 1000)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS boundless_chunks_embedding_idx
+            ON boundless_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists});
+        """)
+    else:
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS boundless_chunks_embedding_idx
+            ON boundless_chunks USING hnsw (embedding vector_cosine_ops);
+        """)
+
+def main():
     # Database setup
     setup_database()
     
-    embedder = SentenceTransformer('all-MiniLM-L6-v2')
+    embedder = load_embedder()
+    chunk_text = Chunker(CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, min_words=CHUNK_MIN_WORDS,
+                         tokenizer=lambda: embedder.tokenizer, tokenizer_name=EMBEDDING_MODEL)
     database_url = os.getenv('DATABASE_URL', 'postgresql://localhost/boundless')
     conn = psycopg2.connect(database_url)
+    # numpy embedding'leri pgvector adapter'ı ile doğrudan gönder (.tolist() yok)
+    register_vector(conn)
     cursor = conn.cursor()
     
+    existing, validators = load_existing(cursor)
+    conn.commit()
+    pages = {}
+    pending = []
     total_chunks = 0
     
-    for url in urls:
-        print(f"[+] {url} çekiliyor...")
-        text = fetch_text_from_url(url)
-        chunks = chunk_text(text)
-        print(f"[+] {len(chunks)} adet chunk bulundu.")
-        
-        if chunks:
-            embeddings = embedder.encode(chunks)
-            embeddings = np.array(embeddings, dtype=np.float32)
-            
-            for i, chunk in enumerate(chunks):
-                cursor.execute("""
-                    INSERT INTO boundless_chunks (content, url, embedding)
-                    VALUES (%s, %s, %s)
-                """, (chunk, url, embeddings[i].tolist()))
-                total_chunks += 1
-            
-            print(f"[+] {url} için embedding ve kayıt tamamlandı.")
-        else:
-            print(f"[!] {url} için chunk bulunamadı.")
+    def embed(chunks):
+        return np.array(embedder.encode(chunks), dtype=np.float32)
+    
+    def is_known(record):
+        return record['hash'] in existing.get(record['url'], {})
+    
+    def flush():
+        nonlocal pending
+        if pending:
+            write_rows(conn, 'boundless_chunks_staging', pending)
+            print(f"[+] {len(pending)} chunk staging tablosuna yazıldı.")
+            pending = []
+    
+    def store_batch(records, embeddings):
+        nonlocal total_chunks
+        for i, record in enumerate(records):
+            pending.append((record['content'], record['url'], embeddings[i], record['hash'], record['chunk_id']))
+        total_chunks += len(records)
+        if len(pending) >= PG_BATCH_SIZE:
+            flush()
+    
+    run_ingestion(BOUNDLESS_URLS, extract_text, chunk_text, embed=embed, on_batch=store_batch,
+                  validators=validators, skip=is_known, pages=pages)
+    flush()
+    
+    cursor.execute("""
+        INSERT INTO boundless_chunks (content, url, embedding, content_hash, chunk_id)
+        SELECT content, url, embedding, content_hash, chunk_id FROM boundless_chunks_staging;
+    """)
+    cursor.execute("TRUNCATE boundless_chunks_staging;")
+    
+    removed, stats = diff_pages(pages, {url: set(hashes) for url, hashes in existing.items()}, total_chunks)
+    remove_ids = [existing[url][h] for url, hashes in removed.items() for h in hashes]
+    if remove_ids:
+        cursor.execute("DELETE FROM boundless_chunks WHERE id = ANY(%s);", (remove_ids,))
+    
+    # Değişen sayfada korunan (hash'i aynı) chunk'ların sırası kaymış olabilir; chunk_id'yi
+    # sayfadaki yeni konumuna çek ki retrieval bitişik chunk'ları doğru birleştirsin
+    positions = [
+        (url, chunk_hash, chunk_id)
+        for url, page in pages.items() if page['status'] == 'fetched'
+        for chunk_hash, chunk_id in page['chunk_positions'].items()
+    ]
+    if positions:
+        execute_values(cursor, """
+            UPDATE boundless_chunks AS c SET chunk_id = v.chunk_id
+            FROM (VALUES %s) AS v (url, content_hash, chunk_id)
+            WHERE c.url = v.url AND c.content_hash = v.content_hash AND c.chunk_id IS DISTINCT FROM v.chunk_id
+        """, positions, page_size=PG_BATCH_SIZE)
+    
+    for url, page in pages.items():
+        if page['status'] in ('fetched', 'unchanged'):
+            cursor.execute("""
+                INSERT INTO boundless_pages (url, etag, last_modified, page_hash, updated_at)
+                VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    page_hash = EXCLUDED.page_hash,
+                    updated_at = EXCLUDED.updated_at
+            """, (url, page['etag'], page['last_modified'], page['page_hash']))
+    cursor.execute("DELETE FROM boundless_pages WHERE NOT (url = ANY(%s));", (BOUNDLESS_URLS,))
+    
+    # Tek transaction: okuyucular commit'e kadar eski indeksi görür, sonra yenisini
+    conn.commit()
     
+    # ANN index'i veri yüklendikten sonra kur - satır satır index güncellemekten çok daha hızlı
+    create_vector_index(cursor)
     conn.commit()
     cursor.close()
     conn.close()
     
-    print(f"[+] Toplam {total_chunks} chunk PostgreSQL'e kaydedildi.")
+    print(f"[+] Refresh tamamlandı: {stats['skipped']} atlandı, {stats['added']} eklendi, {stats['removed']} silindi.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
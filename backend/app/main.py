@@ -1,169 +1,500 @@
 from fastapi import FastAPI, Request
-from sentence_transformers import SentenceTransformer
+from fastapi.responses import JSONResponse, Response
 import numpy as np
 import os
 from typing import List, Optional
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import re
 import json
+from app.ann import ExactIndex, build_ann_index
+from app.batching import EMBED_BATCHING, EmbeddingBatcher
+from app.cache import AnswerCache
+from app.chunk_store import ChunkStore, ChunkStoreBuilder
+from app.chunking import CHUNK_OVERLAP_TOKENS, SENTENCE_END_RE, Chunker
+from app.embeddings import EMBEDDING_BACKEND, EMBEDDING_MODEL, embedding_model_id, load_embedder
+from app.index_store import INDEX_DIR, acquire_build_lock, current_generation, load_index, release_build_lock, save_index
+from app.ingest import BOUNDLESS_URLS, extract_page_text, ingest
+from app.keywords import KEYWORD_SCORING, KeywordIndex
+from app.metrics import ASK_DEBUG_ENABLED, ASK_DEBUG_TOP_K, RequestTrace, StatsCollector, register_collector, render
+from app.router import PREDEFINED_MATCH_MODE, load_router
+from app.retrieval import RETRIEVAL_BACKEND, RETRIEVAL_TOP_K, create_backend, top_k_indices
+from app.web_search import WEB_SEARCH_ERROR, WebSearch
 
 app = FastAPI()
 
-# Embedding modeli (local, ücretsiz)
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-
-# In-memory storage
-boundless_data = []
-
-# Hazır soru-cevap listesi
-PREDEFINED_QA = {
-    "What is Boundless?": {
-        "answer": "Boundless is a decentralized protocol for generating and verifying zero-knowledge (ZK) proofs. It enables anyone to request, produce, and use ZK proofs in a trustless marketplace, powered by RISC Zero zkVM.",
-        "source_url": "https://docs.beboundless.xyz/developers/what",
-        "source": "predefined"
-    },
-    "What is the proof lifecycle?": {
-        "answer": "The proof lifecycle has 6 steps: 1) Program Development, 2) Request Submission, 3) Prover Bidding, 4) Proof Generation, 5) Proof Settlement, 6) Proof Utilization. Each step is decentralized and verifiable.",
-        "source_url": "https://docs.beboundless.xyz/developers/proof-lifecycle",
-        "source": "predefined"
-    },
-    "How to run a prover node?": {
-        "answer": "To run a prover node: 1) Use a powerful machine (32GB+ RAM, modern GPU), 2) Install RISC Zero, 3) Set up Boundless CLI tools, 4) Listen for proof requests and submit results. See the official quick start guide for details.",
-        "source_url": "https://docs.beboundless.xyz/provers/quick-start",
-        "source": "predefined"
-    },
-    "What is ZK mining?": {
-        "answer": "ZK mining is the process of generating zero-knowledge proofs using computational resources. Provers compete to solve proof requests and earn rewards for successful submissions.",
-        "source_url": "https://docs.beboundless.xyz/provers/quick-start",
-        "source": "predefined"
-    },
-    "What is the Boundless SDK?": {
-        "answer": "The Boundless SDK allows developers to interact with the protocol, submit proof requests, and use proofs in their applications. SDKs are available for JavaScript, Python, and Rust.",
-        "source_url": "https://docs.beboundless.xyz/developers/quick-start",
-        "source": "predefined"
-    },
-    "What projects are in the ecosystem?": {
-        "answer": "The Boundless ecosystem includes 25+ projects: Hibachi Exchange (DEX), Lido (Staking), Uniswap, Aave, Compound, MakerDAO, Curve, Balancer, and more. All leverage ZK proofs for enhanced security.",
-        "source_url": "https://beboundless.xyz/ecosystem",
-        "source": "predefined"
-    },
-    "What are the security features?": {
-        "answer": "Boundless security: 1) ZK proofs for mathematical security, 2) Decentralized architecture, 3) Open-source code and audits, 4) Multisig management, 5) Bug bounty program, 6) Continuous updates.",
-        "source_url": "https://docs.beboundless.xyz/developers/core-concepts",
-        "source": "predefined"
-    },
-    "What is the tokenomics?": {
-        "answer": "The ticker is $ZKC",
-        "source_url": "https://beboundless.xyz/",
-        "source": "predefined"
-    }
-}
+# Embedding modeli (local, ücretsiz) - import sırasında değil, ilk ihtiyaçta get_embedder() ile yüklenir
+# MODEL_NAME index artifact'ının anahtarıdır; int8 backend'i ayrı artifact kullanır
+MODEL_NAME = embedding_model_id()
+embedder = None
+embedder_lock = threading.Lock()
+# Model yüklenince gerçek boyutla güncellenir
+EMBEDDING_DIM = 384
+
+# background: süreç port'a hemen bağlanır, model ve index arka planda yüklenir
+# blocking: eski davranış - startup her şey yüklenene kadar bekler
+# off: model ve index hiç yüklenmez (model indirme/scrape olmadan import ve canlılık testleri için)
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'background')
+STARTED_AT = time.monotonic()
+# Her bileşen: pending -> loading -> ready | failed
+startup_state = {'model': 'pending', 'index': 'pending', 'error': None, 'ready_after_s': None}
+warmup_task: Optional[asyncio.Task] = None
+
+STARTING_ANSWER = "The assistant is still starting up, please try again in a few seconds."
+
+# In-memory storage: kolon bazlı chunk'lar + aynı sırada L2-normalize float32 embedding matrisi
+chunk_store = ChunkStore.empty(EMBEDDING_DIM)
+# chunk_store üzerinde ingest sırasında kurulan ters keyword indeksi
+keyword_index = KeywordIndex([])
+# Aramanın ilk aşaması: embedding'ler üzerinde ANN (hnswlib yoksa tam tarama)
+ann_index = ExactIndex(chunk_store.embeddings)
+# Üçü birlikte tek atamada değişir; aramalar tutarlı bir (store, keyword, ann) üçlüsü görür
+corpus = (chunk_store, keyword_index, ann_index)
+
+# /ask'in aday chunk'ları aldığı backend (memory, pgvector veya chroma)
+retrieval_backend = create_backend(RETRIEVAL_BACKEND, lambda: corpus)
+
+# Yayındaki index generation'ı (CURRENT) bu aralıkla kontrol edilir; saniye, 0 = kapalı
+INDEX_WATCH_INTERVAL = float(os.getenv('INDEX_WATCH_INTERVAL', '5'))
+index_watch_task: Optional[asyncio.Task] = None
+
+# Doküman cevabı: en iyi chunk + aynı URL'deki bitişik chunk'lar, toplam karakter bütçesiyle
+ANSWER_MAX_CHARS = int(os.getenv('ANSWER_MAX_CHARS', '700'))
+ANSWER_MAX_CHUNKS = int(os.getenv('ANSWER_MAX_CHUNKS', '3'))
+# Bitişik chunk'ın eklenmesi için soruyla minimum cosine similarity
+ANSWER_NEIGHBOR_MIN_SIMILARITY = float(os.getenv('ANSWER_NEIGHBOR_MIN_SIMILARITY', '0.25'))
+# Farklı bir URL'den ek pasaj: skoru en iyinin bu oranına ulaşan aday (ANSWER_MAX_PASSAGES=1 ile kapalı)
+ANSWER_MAX_PASSAGES = int(os.getenv('ANSWER_MAX_PASSAGES', '2'))
+ANSWER_PASSAGE_RATIO = float(os.getenv('ANSWER_PASSAGE_RATIO', '0.9'))
+
+# Chunk'lama - cevap olarak gösterildikleri için küçük chunk'lar (~30 kelime)
+# Parametreler değişirse diskteki index artifact'ı geçersiz sayılır
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '48'))
+chunker = Chunker(CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS,
+                  tokenizer=lambda: get_embedder().tokenizer, tokenizer_name=EMBEDDING_MODEL)
+CHUNKER_PARAMS = chunker.params()
+
+# Hazır soru-cevap listesi - data/predefined_qa.json'dan import sırasında derlenir
+predefined_router = load_router()
+PREDEFINED_QA = predefined_router.table
+
+# Encode ve skorlama gibi CPU işleri event loop'u bloklamasın diye sınırlı thread pool'da çalışır
+CPU_WORKERS = int(os.getenv('ASK_CPU_WORKERS', str(min(4, os.cpu_count() or 1))))
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix='ask-cpu')
+
+# Web araması fallback'i: havuzlu client, önbellek, istek birleştirme, rate limit ve devre kesici
+web_search = WebSearch()
+
+# /ask cevap önbelleği (exact + semantic, LRU/TTL)
+answer_cache = AnswerCache()
+
+def get_embedder():
+    """Modeli ilk çağrıda yükle (thread-safe); sonraki çağrılar aynı örneği döndürür"""
+    global embedder, EMBEDDING_DIM
+    if embedder is None:
+        with embedder_lock:
+            if embedder is None:
+                model = load_embedder()
+                EMBEDDING_DIM = model.get_sentence_embedding_dimension()
+                embedder = model
+    return embedder
 
-def search_web(query: str) -> str:
+def is_ready() -> bool:
+    return startup_state['model'] == 'ready' and startup_state['index'] == 'ready'
+
+async def run_cpu(fn, *args):
+    """CPU-bound işi sınırlı thread pool'da çalıştır"""
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, fn, *args)
+
+async def encode_query(question: str) -> np.ndarray:
+    """Soruyu event loop dışında encode et; eşzamanlı sorular mikro-batch'lerde birleştirilir"""
+    if EMBED_BATCHING:
+        return await embedding_batcher.encode(question)
+    return (await run_cpu(encode_normalized, [question]))[0]
+
+async def search_web(query: str) -> str:
     """DuckDuckGo ile web araması yap"""
-    try:
-        # DuckDuckGo Instant Answer API
-        search_url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
-        response = requests.get(search_url, timeout=10)
-        data = response.json()
-        
-        if data.get('Abstract'):
-            return data['Abstract']
-        elif data.get('Answer'):
-            return data['Answer']
-        elif data.get('RelatedTopics') and len(data['RelatedTopics']) > 0:
-            return data['RelatedTopics'][0].get('Text', 'No information found.')
-        else:
-            return "I couldn't find specific information about that on the web."
-            
-    except Exception as e:
-        print(f"Web search error: {e}")
-        return "Sorry, I couldn't search the web at the moment."
-
-def fetch_and_process_data():
-    """Boundless verilerini çek ve işle - Gelişmiş scraping"""
-    urls = [
-        'https://beboundless.xyz/',
-        'https://docs.beboundless.xyz/developers/what',
-        'https://docs.beboundless.xyz/developers/proof-lifecycle',
-        'https://docs.beboundless.xyz/developers/why',
-        'https://docs.beboundless.xyz/developers/core-concepts',
-        'https://docs.beboundless.xyz/provers/quick-start',
-        'https://docs.beboundless.xyz/provers/who-should-run',
-        'https://docs.beboundless.xyz/provers/requirements',
-        'https://docs.beboundless.xyz/developers/quick-start',
-        'https://docs.beboundless.xyz/developers/build-a-program',
-        'https://docs.beboundless.xyz/developers/request-a-proof',
-        'https://docs.beboundless.xyz/developers/use-a-proof',
-        'https://beboundless.xyz/ecosystem',
-        'https://beboundless.xyz/blog',
-        'https://read.beboundless.xyz/',
+    return await web_search.search(query)
+
+def encode_normalized(texts: List[str]) -> np.ndarray:
+    """Metinleri encode et, L2-normalize edilmiş contiguous float32 matris döndür"""
+    embeddings = get_embedder().encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+    return np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(texts), EMBEDDING_DIM)
+
+# Eşzamanlı /ask sorularını tek encode çağrısında toplayan zamanlayıcı
+embedding_batcher = EmbeddingBatcher(encode_normalized, run_cpu)
+
+def set_corpus(store: ChunkStore, index: Optional[KeywordIndex] = None, ann=None):
+    """Bellekteki korpusu değiştir; keyword ve ANN indeksleri verilmediyse bir kez kur
+
+    Süren istekler eski (store, keyword, ann) üçlüsüyle tamamlanır.
+    """
+    global corpus, chunk_store, keyword_index, ann_index
+    if index is None:
+        index = KeywordIndex(list(store.texts()))
+    if ann is None:
+        ann = build_ann_index(store.embeddings, store.eligible_mask())
+    corpus = (store, index, ann)
+    chunk_store, keyword_index, ann_index = corpus
+    # Eski index'ten üretilmiş cevaplar artık geçersiz
+    answer_cache.clear()
+
+async def search_documents(question: str, normalized_question: str, question_words: set, top_k: int = 1,
+                           question_embedding: Optional[np.ndarray] = None, trace: Optional[RequestTrace] = None):
+    """Backend'den aday chunk'ları al, embedding + keyword skoru ile sırala, en iyi (chunk, skor) listesini döndür"""
+    trace = trace or RequestTrace()
+    if question_embedding is None:
+        with trace.stage('embedding'):
+            question_embedding = await encode_query(question)
+    store, ranked, _ = await retrieve(question_embedding, normalized_question, question_words, top_k, trace)
+    return [(store.record(i), score) for i, score in ranked]
+
+async def retrieve(question_embedding: np.ndarray, normalized_question: str, question_words: set, top_k: int,
+                   trace: RequestTrace) -> tuple:
+    """İki aşamalı arama: (store, ilk top_k [(chunk indeksi, skor)], {aday indeksi: cosine similarity})
+
+    Debug modunda ilk ASK_DEBUG_TOP_K aday ayrıca trace'e yazılır; döndürülen liste
+    (ve ondan kurulan cevap) debug'dan bağımsızdır.
+    """
+    # 1. aşama: ANN ile RETRIEVAL_TOP_K aday
+    with trace.stage('retrieval'):
+        store, candidates, similarities, index = await retrieval_backend.search(question_embedding, RETRIEVAL_TOP_K)
+    trace.scanned(len(candidates))
+    if not len(candidates):
+        return store, [], {}
+    # 2. aşama: sadece adaylar keyword + bonus ile yeniden sıralanır
+    with trace.stage('rank'):
+        ranked = await run_cpu(rank_candidates, store, candidates, similarities, index,
+                               normalized_question, question_words,
+                               max(top_k, ASK_DEBUG_TOP_K) if trace.debug else top_k)
+    if trace.debug:
+        trace.set_candidates([(store.record(i), score) for i, score in ranked[:ASK_DEBUG_TOP_K]])
+    return store, ranked[:top_k], dict(zip(candidates.tolist(), similarities.tolist()))
+
+def rank_candidates(store: ChunkStore, candidates: np.ndarray, similarities: np.ndarray, index: KeywordIndex,
+                    normalized_question: str, question_words: set, top_k: int) -> list:
+    """Adayları embedding + keyword + bonus skoruyla sırala: [(chunk indeksi, skor)]"""
+    # Anahtar kelime eşleşmesi ve özel kelime bonusları - posting listelerinden, sadece adaylar için
+    keyword_overlap = index.keyword_scores(question_words, KEYWORD_SCORING, candidates)
+    special_bonus = index.special_bonus(normalized_question, candidates)
+    
+    # Toplam skor: embedding + keyword + bonus
+    scores = similarities + (keyword_overlap * 0.3) + (special_bonus * 0.2)
+    
+    # Chunk filtreleme - çok uzun/çok kısa ve Title chunk'larını atla (kurulumda hesaplanmış maske)
+    scores[~store.eligible_mask()[candidates]] = -np.inf
+    
+    return [
+        (int(candidates[j]), float(scores[j]))
+        for j in top_k_indices(scores, top_k)
+        if np.isfinite(scores[j])
     ]
+
+def join_adjacent(left: str, right: str) -> str:
+    """Bitişik iki chunk'ı birleştir; overlap'te sağdakinin başında tekrar eden cümleleri at"""
+    for match in SENTENCE_END_RE.finditer(left):
+        if right.startswith(left[match.end():]):
+            return left + right[len(left) - match.end():]
+    return f"{left} {right}"
+
+def assemble_answer(store: ChunkStore, ranked: list, similarities: dict, question_embedding: np.ndarray) -> tuple:
+    """En iyi adaylardan, aynı URL'deki bitişik chunk'larla genişletilmiş pasajlar kur: (cevap, kaynak URL'ler)"""
+    def similarity(j):
+        if j in similarities:
+            return similarities[j]
+        # Uzak backend'lerin aday deposunda embedding yok; orada komşular zaten aday kümesinde
+        if store.embeddings.shape[1] == len(question_embedding):
+            return float(np.dot(store.embeddings[j], question_embedding))
+        return 0.0
+    
+    passages = []
+    used = set()
+    length = 0
+    best_score = ranked[0][1]
+    for i, score in ranked:
+        if len(passages) >= ANSWER_MAX_PASSAGES:
+            break
+        if passages and (score <= 0.3 or score < best_score * ANSWER_PASSAGE_RATIO or i in used
+                         or store.url(i) in [url for url, _ in passages]
+                         or length + store.lengths[i] > ANSWER_MAX_CHARS):
+            continue
+        # En iyi chunk her zaman tam haliyle; komşular bütçe ve benzerlik izin verdikçe, iyi olan taraftan
+        first = last = i
+        length += int(store.lengths[i])
+        while last - first + 1 < ANSWER_MAX_CHUNKS:
+            options = []
+            for edge, step in ((first, -1), (last, 1)):
+                j = store.neighbor(edge, step)
+                if (j is not None and j not in used and not store.is_title[j]
+                        and length + store.lengths[j] <= ANSWER_MAX_CHARS):
+                    neighbor_similarity = similarity(j)
+                    if neighbor_similarity >= ANSWER_NEIGHBOR_MIN_SIMILARITY:
+                        options.append((neighbor_similarity, j))
+            if not options:
+                break
+            _, j = max(options)
+            length += int(store.lengths[j])
+            first, last = min(first, j), max(last, j)
+        used.update(range(first, last + 1))
+        text = store.text(first).strip()
+        for j in range(first + 1, last + 1):
+            text = join_adjacent(text, store.text(j).strip())
+        passages.append((store.url(i), text))
     
-    for url in urls:
+    return '\n\n'.join(text for _, text in passages), [url for url, _ in passages]
+
+async def fetch_and_process_data():
+    """Boundless verilerini eşzamanlı çek, işle ve embedding'lerini batch'ler halinde hesapla"""
+    # Chunker modelin tokenizer'ını kullanır - event loop'ta yüklenmesin
+    await asyncio.to_thread(get_embedder)
+    builder = ChunkStoreBuilder()
+    async for batch, batch_embeddings in ingest(BOUNDLESS_URLS, extract_page_text, chunker, embed=encode_normalized):
+        builder.add(batch, batch_embeddings)
+    
+    store = builder.build(EMBEDDING_DIM)
+    if not len(store):
+        # Kaynaklar erişilemez: boş korpus yayınlanıp sonraki açılışlarda geçerli index sanılmasın
+        raise RuntimeError("live scrape produced no chunks")
+    set_corpus(store)
+
+def publish_corpus():
+    """Canlı scrape sonucunu yeni generation olarak yaz; diğer worker'lar onu açar"""
+    if not len(chunk_store):
+        return
+    try:
+        path = save_index(INDEX_DIR, chunk_store, MODEL_NAME, CHUNKER_PARAMS, keyword_index, ann_index)
+        print(f"Published index generation {path}")
+    except OSError as e:
+        print(f"Could not publish index to {INDEX_DIR}: {e}")
+
+async def load_data():
+    """Yayındaki index generation'ını mmap ile aç; yoksa veya eskiyse canlı scrape yap"""
+    loaded = await asyncio.to_thread(load_index, INDEX_DIR, MODEL_NAME, CHUNKER_PARAMS)
+    if loaded is None:
+        # Birden çok worker varsa sadece kilidi alan scrape eder; diğerleri onun yayınladığını açar
         try:
-            print(f"Fetching: {url}")
-            resp = requests.get(url, timeout=15, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            # Ana içerik metnini çek - daha kapsamlı
-            texts = []
-            
-            # Başlıkları al
-            for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5']):
-                txt = tag.get_text(strip=True)
-                if len(txt) > 5 and len(txt) < 200:
-                    texts.append(f"Title: {txt}")
-            
-            # Paragrafları al
-            for tag in soup.find_all(['p', 'li', 'div']):
-                txt = tag.get_text(strip=True)
-                if len(txt) > 20 and len(txt) < 1000:  # Daha uzun metinler
-                    texts.append(txt)
-            
-            # Chunk'lara böl - daha küçük chunk'lar
-            full_text = ' '.join(texts)
-            sentences = re.split(r'(?<=[.!?]) +', full_text)
-            
-            chunk = ''
-            for sent in sentences:
-                if len((chunk + sent).split()) > 30:  # 30 kelimelik chunk'lar
-                    if chunk.strip():
-                        boundless_data.append({
-                            'content': chunk.strip(),
-                            'url': url
-                        })
-                    chunk = sent
-                else:
-                    chunk += ' ' + sent
-            
-            if chunk.strip():
-                boundless_data.append({
-                    'content': chunk.strip(),
-                    'url': url
-                })
-                
+            lock = await asyncio.to_thread(acquire_build_lock, INDEX_DIR)
+        except OSError as e:
+            # Index dizini yazılamıyorsa kilitsiz scrape et; yayın adımı da aynı hatayı loglayıp geçer
+            print(f"Could not take build lock in {INDEX_DIR}: {e}; scraping without it")
+            lock = None
+        try:
+            loaded = await asyncio.to_thread(load_index, INDEX_DIR, MODEL_NAME, CHUNKER_PARAMS)
+            if loaded is None:
+                print("No usable index artifact, scraping live...")
+                await fetch_and_process_data()
+                await asyncio.to_thread(publish_corpus)
+                # Yayınlanan kopyayı aç ki bu worker da page cache'i paylaşsın
+                loaded = await asyncio.to_thread(load_index, INDEX_DIR, MODEL_NAME, CHUNKER_PARAMS)
+        finally:
+            if lock is not None:
+                release_build_lock(lock)
+    if loaded is not None:
+        set_corpus(*loaded)
+        print(f"Loaded index generation {chunk_store.generation} from {INDEX_DIR}")
+
+async def watch_index():
+    """CURRENT değişince yeni generation'ı arka planda aç ve korpusu tek atamada değiştir"""
+    failed = None
+    while True:
+        await asyncio.sleep(INDEX_WATCH_INTERVAL)
+        generation = current_generation(INDEX_DIR, MODEL_NAME, CHUNKER_PARAMS)
+        if generation is None or generation in (chunk_store.generation, failed):
+            continue
+        try:
+            loaded = await asyncio.to_thread(load_index, INDEX_DIR, MODEL_NAME, CHUNKER_PARAMS)
+        except Exception as e:
+            print(f"Index reload failed: {e}")
+            loaded = None
+        if loaded is None:
+            failed = generation
+            continue
+        set_corpus(*loaded)
+        print(f"Switched to index generation {chunk_store.generation} ({len(chunk_store)} chunks)")
+        if startup_state['index'] == 'failed':
+            # Açılışta index yüklenememişti (ör. scrape boş döndü); yayınlanan generation ile hazır
+            startup_state['index'] = 'ready'
+            if startup_state['model'] != 'failed':
+                startup_state['error'] = None
+            if is_ready():
+                startup_state['ready_after_s'] = round(time.monotonic() - STARTED_AT, 2)
+
+async def load_model():
+    """Embedding modelini thread'de yükle"""
+    startup_state['model'] = 'loading'
+    started = time.perf_counter()
+    await asyncio.to_thread(get_embedder)
+    if PREDEFINED_MATCH_MODE == 'embedding':
+        # Hazır soru embedding'leri ilk istekte değil açılışta hesaplansın
+        await run_cpu(predefined_router.prepare_embeddings, encode_normalized)
+    startup_state['model'] = 'ready'
+    print(f"Loaded model {MODEL_NAME} ({EMBEDDING_BACKEND}) in {time.perf_counter() - started:.1f}s")
+
+async def load_corpus():
+    """Retrieval backend'ini başlat ve (memory backend'de) index'i yükle"""
+    global index_watch_task
+    startup_state['index'] = 'loading'
+    await retrieval_backend.start()
+    if retrieval_backend.name != 'memory':
+        # Chunk'lar harici store'da - bu süreçte scrape/index yüklemeye gerek yok
+        print(f"Using {retrieval_backend.name} retrieval backend ({await retrieval_backend.count()} chunks)")
+    else:
+        print("Loading Boundless data...")
+        try:
+            # Artifact varsa modelden bağımsız açılır; canlı scrape ise modeli bekler
+            await load_data()
+        finally:
+            # Açılış başarısız olsa da izle: build_index veya başka bir worker yayınlarsa toparlanır
+            if INDEX_WATCH_INTERVAL > 0 and index_watch_task is None:
+                index_watch_task = asyncio.create_task(watch_index())
+        print(f"Loaded {len(chunk_store)} chunks ({chunk_store.nbytes() / 2 ** 20:.1f} MB)")
+    startup_state['index'] = 'ready'
+
+async def warm_up():
+    """Model ve index'i paralel yükle; hata durumunu readiness'ta raporla"""
+    async def track(component, loader):
+        try:
+            await loader()
         except Exception as e:
-            print(f"Error fetching {url}: {e}")
+            startup_state[component] = 'failed'
+            startup_state['error'] = f"{component}: {e}"
+            print(f"Startup error ({component}): {e}")
+
+    await asyncio.gather(track('model', load_model), track('index', load_corpus))
+    if is_ready():
+        startup_state['ready_after_s'] = round(time.monotonic() - STARTED_AT, 2)
+        print(f"Ready after {startup_state['ready_after_s']}s")
 
 # Uygulama başladığında verileri yükle
 @app.on_event("startup")
 async def startup_event():
-    print("Loading Boundless data...")
-    fetch_and_process_data()
-    print(f"Loaded {len(boundless_data)} chunks")
+    global warmup_task
+    if STARTUP_MODE == 'blocking':
+        await warm_up()
+    elif STARTUP_MODE == 'off':
+        print("STARTUP_MODE=off: model and index are not loaded, service will not become ready")
+    else:
+        # Port hemen açılır; hazır cevaplar ve /health/live yükleme sırasında da çalışır
+        warmup_task = asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in (warmup_task, index_watch_task):
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    await retrieval_backend.close()
+    await embedding_batcher.close()
+    await web_search.close()
+    cpu_executor.shutdown(wait=False)
+
+async def chunks_loaded() -> int:
+    # Harici backend'ler start() tamamlanmadan sayılamaz
+    if startup_state['index'] != 'ready':
+        return len(chunk_store)
+    return await retrieval_backend.count()
+
+def index_info() -> dict:
+    """/metrics için yüklü index'in boyutu ve yaşı (harici backend'lerde boş)"""
+    if retrieval_backend.name != 'memory' or startup_state['index'] != 'ready':
+        return {}
+    return {'chunks': len(chunk_store), 'bytes': chunk_store.nbytes(), 'built_at': chunk_store.built_at}
+
+register_collector(StatsCollector(answer_cache, web_search, embedding_batcher, index_info))
 
 @app.get("/")
-def root():
-    return {"message": "Boundless Assistant Backend Çalışıyor!", "chunks_loaded": len(boundless_data)}
+async def root():
+    return {"message": "Boundless Assistant Backend Çalışıyor!", "chunks_loaded": await chunks_loaded()}
 
 @app.get("/predefined-questions")
 def get_predefined_questions():
     """Hazır soruları döndür"""
-    return {"questions": list(PREDEFINED_QA.keys())}
+    return {"questions": predefined_router.questions}
+
+async def answer_question(question: str, normalized_question: str, question_words: set,
+                          trace: Optional[RequestTrace] = None) -> tuple:
+    """Hazır cevap -> semantic önbellek -> doküman -> web sırasıyla cevapla
+
+    (cevap, soru embedding'i, semantic önbellekten mi geldi) döndürür.
+    """
+    trace = trace or RequestTrace()
+    
+    # 1. Önce hazır soru-cevap listesinde akıllı ara
+    with trace.stage('predefined'):
+        best_predefined_match, best_predefined_score = predefined_router.match(normalized_question, question_words)
+    
+    # Model veya index henüz yüklenmediyse sadece hazır cevaplar verilebilir
+    if best_predefined_match is None and not is_ready():
+        return {
+            "answer": STARTING_ANSWER,
+            "source_url": None,
+            "source_urls": [],
+            "similarity_score": 0.0,
+            "source": "starting"
+        }, None, False
+    
+    # İsteğe bağlı: keyword eşleşmesi yetersizse önbellekteki soru embedding'leriyle dene
+    question_embedding = None
+    if best_predefined_match is None and PREDEFINED_MATCH_MODE == 'embedding':
+        with trace.stage('embedding'):
+            question_embedding = await encode_query(question)
+        with trace.stage('predefined'):
+            best_predefined_match, best_predefined_score = predefined_router.match_embedding(
+                question_embedding, encode_normalized
+            )
+    
+    # Eğer yeterince iyi bir predefined match varsa, onu döndür
+    if best_predefined_match is not None:
+        return {
+            "answer": best_predefined_match["answer"],
+            "source_url": best_predefined_match["source_url"],
+            "source_urls": [best_predefined_match["source_url"]],
+            "similarity_score": float(best_predefined_score),
+            "source": "predefined"
+        }, question_embedding, False
+    
+    if question_embedding is None:
+        with trace.stage('embedding'):
+            question_embedding = await encode_query(question)
+    
+    # Benzer bir soru yakın zamanda cevaplandıysa onu kullan
+    with trace.stage('cache'):
+        cached = answer_cache.get_semantic(question_embedding)
+    if cached is not None:
+        return cached, question_embedding, True
+    
+    # 2. Dokümanda ara - ANN adayları, yeniden sıralama, bitişik chunk'lardan cevap
+    # Ek pasaj adayları için birkaç sonuç
+    store, ranked, similarities = await retrieve(question_embedding, normalized_question, question_words,
+                                                 ANSWER_MAX_PASSAGES * 3, trace)
+    if ranked:
+        best_index, best_score = ranked[0]
+        
+        if best_score > 0.3:  # Minimum similarity threshold
+            with trace.stage('assemble'):
+                answer, source_urls = assemble_answer(store, ranked, similarities, question_embedding)
+            
+            return {
+                "answer": answer,
+                "source_url": store.url(best_index),
+                "source_urls": source_urls,
+                "similarity_score": float(best_score),
+                "source": "documentation"
+            }, question_embedding, False
+    
+    # 3. Son çare: web araması
+    with trace.stage('web_search'):
+        web_answer = await search_web(question + " Boundless blockchain protocol")
+    
+    return {
+        "answer": web_answer,
+        "source_url": "https://duckduckgo.com",
+        "source_urls": ["https://duckduckgo.com"],
+        "similarity_score": 0.0,
+        "source": "web_search"
+    }, question_embedding, False
 
 @app.post("/ask")
 async def ask(request: Request):
@@ -171,134 +502,90 @@ async def ask(request: Request):
     question = data.get("question", "")
     
     if not question:
-        return {"answer": "Please ask a question.", "source_url": None}
+        return {"answer": "Please ask a question.", "source_url": None, "source_urls": []}
+    
+    # ?debug=1 veya {"debug": true}: aşama süreleri ve aday skorları cevaba eklenir
+    debug = ASK_DEBUG_ENABLED and (data.get("debug") is True or request.query_params.get("debug") == "1")
+    trace = RequestTrace(debug=debug)
     
     try:
         # Soruyu normalize et
         normalized_question = question.lower().strip()
         question_words = set(re.findall(r'\w+', normalized_question))
         
-        # 1. Önce hazır soru-cevap listesinde akıllı ara
-        best_predefined_match = None
-        best_predefined_score = 0
-        
-        for predefined_q, predefined_a in PREDEFINED_QA.items():
-            predefined_words = set(re.findall(r'\w+', predefined_q.lower()))
-            
-            # Anahtar kelime eşleşmesi
-            keyword_overlap = len(question_words & predefined_words)
-            
-            # Tam eşleşme kontrolü
-            if normalized_question in predefined_q.lower() or predefined_q.lower() in normalized_question:
-                keyword_overlap += 5  # Bonus puan
-            
-            # Özel kelime eşleşmeleri
-            special_keywords = {
-                'boundless': 3,
-                'proof': 2,
-                'lifecycle': 2,
-                'prover': 2,
-                'node': 2,
-                'zk': 2,
-                'mining': 2,
-                'sdk': 2,
-                'ecosystem': 2,
-                'security': 2,
-                'tokenomics': 3,
-                'token': 2,
-                'zkc': 3
-            }
-            
-            for word, weight in special_keywords.items():
-                if word in normalized_question and word in predefined_q.lower():
-                    keyword_overlap += weight
-            
-            if keyword_overlap > best_predefined_score:
-                best_predefined_score = keyword_overlap
-                best_predefined_match = predefined_a
-        
-        # Eğer yeterince iyi bir predefined match varsa, onu döndür
-        if best_predefined_score >= 2:
-            return {
-                "answer": best_predefined_match["answer"],
-                "source_url": best_predefined_match["source_url"],
-                "similarity_score": float(best_predefined_score),
-                "source": "predefined"
-            }
-        
-        # 2. Dokümanda ara - daha akıllı arama
-        if boundless_data:
-            question_embedding = embedder.encode([question])[0]
-            best_match = None
-            best_score = -1
-            
-            for chunk in boundless_data:
-                # Chunk filtreleme - çok uzun veya çok kısa chunk'ları atla
-                if len(chunk['content']) < 20 or len(chunk['content']) > 800:
-                    continue
-                
-                # Title chunk'larını atla
-                if chunk['content'].startswith('Title:'):
-                    continue
-                
-                chunk_embedding = embedder.encode([chunk['content']])[0]
-                similarity = np.dot(question_embedding, chunk_embedding) / (
-                    np.linalg.norm(question_embedding) * np.linalg.norm(chunk_embedding)
-                )
-                
-                # Anahtar kelime eşleşmesi
-                chunk_words = set(re.findall(r'\w+', chunk['content'].lower()))
-                keyword_overlap = len(question_words & chunk_words)
-                
-                # Özel kelime bonusları
-                special_bonus = 0
-                for word, weight in special_keywords.items():
-                    if word in normalized_question and word in chunk['content'].lower():
-                        special_bonus += weight
-                
-                # Toplam skor: embedding + keyword + bonus
-                score = similarity + (keyword_overlap * 0.3) + (special_bonus * 0.2)
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = chunk
-            
-            if best_match and best_score > 0.3:  # Minimum similarity threshold
-                # Cevabı daha akıllıca formatla
-                answer = best_match['content'].strip()
-                
-                # Çok uzunsa kısalt
-                if len(answer) > 300:
-                    sentences = answer.split('.')
-                    shortened = ''
-                    for sentence in sentences:
-                        if len(shortened + sentence) < 300:
-                            shortened += sentence + '.'
-                        else:
-                            break
-                    answer = shortened.strip()
-                
-                return {
-                    "answer": answer,
-                    "source_url": best_match['url'],
-                    "similarity_score": float(best_score),
-                    "source": "documentation"
-                }
-        
-        # 3. Son çare: web araması
-        web_answer = search_web(question + " Boundless blockchain protocol")
+        # Cevap hesaplanırken index yenilenirse eski cevap önbelleğe yazılmaz
+        cache_epoch = answer_cache.epoch
+        with trace.stage('cache'):
+            cached = answer_cache.get(normalized_question)
+        if cached is not None:
+            trace.finish('cache')
+            return trace.attach(cached)
         
-        return {
-            "answer": web_answer,
-            "source_url": "https://duckduckgo.com",
-            "similarity_score": 0.0,
-            "source": "web_search"
-        }
+        response, question_embedding, from_cache = await answer_question(question, normalized_question, question_words,
+                                                                          trace)
+        trace.finish('cache' if from_cache else response["source"])
+        if from_cache:
+            return trace.attach(response)
+        answer_cache.record_miss()
+        if response["answer"] != WEB_SEARCH_ERROR and response["source"] != "starting":
+            answer_cache.put(normalized_question, question_embedding, response, cache_epoch)
+        return trace.attach(response)
             
     except Exception as e:
+        trace.finish('error')
         print(f"Error: {e}")
-        return {"answer": "Sorry, an error occurred.", "source_url": None}
+        return {"answer": "Sorry, an error occurred.", "source_url": None, "source_urls": []}
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Cevap önbelleği hit/miss sayaçları"""
+    return answer_cache.stats()
 
-@app.post("/health")
+@app.get("/web-search-stats")
+def web_search_stats():
+    """Web araması önbellek, birleştirme, rate limit ve devre kesici sayaçları"""
+    return web_search.stats()
+
+@app.get("/embedding-stats")
+async def embedding_stats():
+    """Sorgu embedding batch boyutu ve kuyrukta bekleme metrikleri"""
+    return embedding_batcher.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrikleri: aşama süreleri, taranan chunk'lar, önbellek, fallback, batch boyutu, index"""
+    # async: sayaçlar, onları güncelleyen event loop'ta okunur (threadpool'da değil)
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+@app.api_route("/health", methods=["GET", "POST"])
 async def health_check():
-    return {"status": "healthy", "chunks_loaded": len(boundless_data)} 
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "ready": is_ready(),
+        "chunks_loaded": await chunks_loaded(),
+        "index_generation": chunk_store.generation,
+        "worker_pid": os.getpid(),
+        "retrieval_backend": retrieval_backend.name
+    }
+
+@app.get("/health/live")
+def liveness():
+    """Süreç ayakta ve istek alıyor - model/index yüklemesi sürüyor olabilir"""
+    return {"status": "alive", "uptime_s": round(time.monotonic() - STARTED_AT, 2)}
+
+@app.get("/health/ready")
+async def readiness():
+    """Model ve index yüklendiyse 200, aksi halde durumla birlikte 503"""
+    ready = is_ready()
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "ready" if ready else "starting",
+        "model": startup_state['model'],
+        "index": startup_state['index'],
+        "error": startup_state['error'],
+        "ready_after_s": startup_state['ready_after_s'],
+        "chunks_loaded": await chunks_loaded(),
+        "index_generation": chunk_store.generation,
+        "retrieval_backend": retrieval_backend.name
+    })
+ 
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""/ask hattı için aşama bazlı zamanlama ve Prometheus metrikleri
+
+Her /ask isteği bir RequestTrace taşır; `with trace.stage(ad):` bloğunun süresi
+hem isteğin kendi zamanlamalarına (debug cevabı) hem de ask_stage_seconds
+histogramına yazılır. Aşamalar:
+    cache       - exact ve semantic cevap önbelleği araması
+    predefined  - hazır soru eşleştirme
+    embedding   - soru encode (batch kuyruğunda bekleme dahil)
+    retrieval   - backend'den aday chunk'lar (memory backend'de ANN ile RETRIEVAL_TOP_K aday)
+    rank        - adayların keyword + bonus skorlaması ve top-k seçimi
+    assemble    - en iyi chunk'lar ve bitişik komşularından cevap metni
+    web_search  - web fallback'i
+    total       - isteğin tamamı
+
+Önbellek, web araması, embedding batch ve index metrikleri bileşenlerin kendi
+stats() sayaçlarından scrape anında okunur (StatsCollector); o modüller
+prometheus_client'a bağımlı değildir. Web fallback oranı örneğin:
+    rate(ask_responses_total{source="web_search"}[5m]) / rate(ask_responses_total[5m])
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+# /ask?debug=1 veya {"debug": true} ile zamanlamalar ve aday skorları cevaba eklenir;
+# aday önizlemeleri ve iç zamanlamalar açığa çıktığı için varsayılan kapalı
+ASK_DEBUG_ENABLED = os.getenv('ASK_DEBUG_ENABLED', '0') == '1'
+# Debug cevabında gösterilecek aday chunk sayısı
+ASK_DEBUG_TOP_K = int(os.getenv('ASK_DEBUG_TOP_K', '5'))
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+STAGE_SECONDS = Histogram('ask_stage_seconds', '/ask time spent per pipeline stage', ['stage'],
+                          buckets=STAGE_BUCKETS)
+RESPONSES = Counter('ask_responses', '/ask responses by answering stage', ['source'])
+CHUNKS_SCANNED = Histogram('ask_chunks_scanned', 'Candidate chunks scored per documentation search',
+                           buckets=(10, 100, 500, 1000, 5000, 10000, 50000, 100000))
+
+
+class RequestTrace:
+    """Tek bir /ask isteğinin aşama süreleri ve (debug modunda) aday chunk'ları"""
+
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.chunks_scanned = 0
+        self.candidates = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        STAGE_SECONDS.labels(name).observe(seconds)
+
+    def scanned(self, chunks: int):
+        self.chunks_scanned += chunks
+        CHUNKS_SCANNED.observe(chunks)
+
+    def set_candidates(self, results: list):
+        """rank_candidates çıktısı: [(chunk, skor), ...]"""
+        if self.debug:
+            self.candidates = [
+                {'url': chunk['url'], 'chunk_id': chunk['chunk_id'], 'score': round(score, 4),
+                 'preview': chunk['content'][:160]}
+                for chunk, score in results
+            ]
+
+    def finish(self, source: str):
+        self.record('total', time.perf_counter() - self.started)
+        RESPONSES.labels(source).inc()
+
+    def attach(self, response: dict) -> dict:
+        """Debug modunda cevabın kopyasına zamanlamaları ekle (önbellekteki kayıt değişmez)"""
+        if not self.debug:
+            return response
+        return {**response, 'debug': {
+            'timings_ms': {name: round(seconds * 1000.0, 3) for name, seconds in self.timings.items()},
+            'chunks_scanned': self.chunks_scanned,
+            'candidates': self.candidates,
+        }}
+
+
+class StatsCollector:
+    """Bileşenlerin stats() sayaçlarını scrape anında Prometheus metriklerine çevirir"""
+
+    def __init__(self, answer_cache, web_search, embedding_batcher, index_info: Callable[[], dict]):
+        self.answer_cache = answer_cache
+        self.web_search = web_search
+        self.embedding_batcher = embedding_batcher
+        # () -> {'chunks', 'bytes', 'built_at'}; index yüklenmediyse veya harici backend'de {}
+        self.index_info = index_info
+
+    def collect(self):
+        cache = self.answer_cache.stats()
+        hits = CounterMetricFamily('answer_cache_hits', 'Answer cache hits by layer', labels=['layer'])
+        for layer, count in cache['hits'].items():
+            hits.add_metric([layer], count)
+        yield hits
+        yield CounterMetricFamily('answer_cache_misses', 'Answer cache misses', value=cache['misses'])
+        yield CounterMetricFamily('answer_cache_evictions', 'Answer cache evictions', value=cache['evictions'])
+        yield GaugeMetricFamily('answer_cache_entries', 'Answer cache entries', value=cache['size'])
+
+        web = self.web_search.stats()
+        events = CounterMetricFamily('web_search_events', 'Web search fallback events', labels=['event'])
+        for event in ('requests', 'cache_hits', 'coalesced', 'upstream_calls', 'errors', 'timeouts',
+                      'rate_limited', 'short_circuited'):
+            events.add_metric([event], web[event])
+        yield events
+        breaker = GaugeMetricFamily('web_search_breaker_state', 'Web search circuit breaker state', labels=['state'])
+        for state in ('closed', 'open', 'half_open'):
+            breaker.add_metric([state], 1.0 if web['breaker']['state'] == state else 0.0)
+        yield breaker
+
+        # Counter'ın anlık kopyası; kovalar ve +Inf aynı kopyadan hesaplanır
+        batch_sizes = dict(self.embedding_batcher.batch_sizes)
+        buckets = []
+        for bound in BATCH_SIZE_BUCKETS:
+            buckets.append((str(bound), sum(count for size, count in batch_sizes.items() if size <= bound)))
+        buckets.append(('+Inf', sum(batch_sizes.values())))
+        yield HistogramMetricFamily('embedding_batch_size', 'Queries per embedding encode call',
+                                    buckets=buckets, sum_value=sum(size * count for size, count in batch_sizes.items()))
+
+        index = self.index_info()
+        if index:
+            yield GaugeMetricFamily('index_chunks', 'Chunks in the loaded index', value=index['chunks'])
+            yield GaugeMetricFamily('index_size_bytes', 'Approximate size of the loaded index', value=index['bytes'])
+            yield GaugeMetricFamily('index_age_seconds', 'Seconds since the loaded index was built',
+                                    value=time.time() - index['built_at'])
+
+
+def register_collector(collector: StatsCollector):
+    REGISTRY.register(collector)
+
+
+def render() -> tuple:
+    """(gövde, content type)"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,190 @@
+"""/ask için değiştirilebilir retrieval backend'leri
+
+RETRIEVAL_BACKEND ile seçilir:
+    memory   - süreç içindeki ChunkStore + ANN index'i (varsayılan, bkz. app/ann.py)
+    pgvector - load_docs_postgres.py'nin doldurduğu boundless_chunks tablosu (asyncpg pool)
+    chroma   - load_docs.py'nin doldurduğu boundless_docs koleksiyonu
+
+Her backend search(question_embedding, k) ile aramanın ilk aşamasını yapar ve
+(ChunkStore, aday indeksleri, adayların cosine similarity'leri, KeywordIndex)
+döndürür. Keyword/bonus ile yeniden sıralama ve cevabın bitişik chunk'lardan
+kurulması main.py'de, sadece bu k aday üzerinde yapılır.
+"""
+import asyncio
+import os
+
+import numpy as np
+
+from app.chunk_store import ChunkStore
+from app.keywords import KeywordIndex
+
+RETRIEVAL_BACKEND = os.getenv('RETRIEVAL_BACKEND', 'memory')
+# İlk aşamada alınacak ANN aday sayısı; ikinci aşama sadece bunları skorlar
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '50'))
+DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://localhost/boundless')
+PG_POOL_MIN_SIZE = int(os.getenv('PG_POOL_MIN_SIZE', '1'))
+PG_POOL_MAX_SIZE = int(os.getenv('PG_POOL_MAX_SIZE', '10'))
+# pgvector sorgu parametreleri. HNSW sorgusu en fazla ef_search satır döndürür (varsayılan 40,
+# RETRIEVAL_TOP_K'nın altında); IVFFlat varsayılanı probes=1 tek listeyi tarar
+PG_HNSW_EF_SEARCH = int(os.getenv('PG_HNSW_EF_SEARCH', '100'))
+PG_IVFFLAT_PROBES = int(os.getenv('PG_IVFFLAT_PROBES', '10'))
+CHROMA_HOST = os.getenv('CHROMA_HOST', 'chroma')
+CHROMA_PORT = int(os.getenv('CHROMA_PORT', '8000'))
+CHROMA_COLLECTION = os.getenv('CHROMA_COLLECTION', 'boundless_docs')
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """En yüksek k skorun indekslerini azalan sırada döndür (eşitlikte küçük indeks önce)"""
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k == 1:
+        return np.array([int(np.argmax(scores))])
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def candidate_set(records: list, similarities: list) -> tuple:
+    """Uzak backend sonuçlarını (URL, chunk_id) sırasıyla adaylara çevir; bitişik chunk'lar yan yana düşer"""
+    order = sorted(range(len(records)), key=lambda i: (
+        records[i]['url'] or '', -1 if records[i].get('chunk_id') is None else records[i]['chunk_id']
+    ))
+    store = ChunkStore.from_records([records[i] for i in order])
+    similarities = np.array(similarities, dtype=np.float64)[order] if order else np.zeros(0, dtype=np.float64)
+    return store, np.arange(len(store)), similarities, KeywordIndex(list(store.texts()))
+
+
+class InMemoryBackend:
+    """Süreç içi chunk'lar üzerinde ANN (veya tam tarama) ile ilk k aday"""
+    name = 'memory'
+
+    def __init__(self, source):
+        # source() -> (chunk_store, keyword_index, ann_index); main.py'deki güncel veriyi döndürür
+        self.source = source
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def search(self, question_embedding: np.ndarray, k: int = RETRIEVAL_TOP_K) -> tuple:
+        store, keyword_index, ann_index = self.source()
+        if not len(store):
+            return store, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), keyword_index
+        # Büyük korpusta event loop'u bloklamasın
+        candidates, similarities = await asyncio.to_thread(ann_index.search, question_embedding, k)
+        return store, candidates, similarities, keyword_index
+
+    async def count(self) -> int:
+        return len(self.source()[0])
+
+
+class PgVectorBackend:
+    """boundless_chunks üzerinde pooled asyncpg bağlantısıyla ANN sorgusu"""
+    name = 'pgvector'
+
+    def __init__(self, database_url: str = DATABASE_URL):
+        self.database_url = database_url
+        self.pool = None
+        # Bağlantı başına ayarlanan ef_search; daha büyük k isteyen sorgu kendi bağlantısında yükseltir
+        self.ef_search = max(PG_HNSW_EF_SEARCH, RETRIEVAL_TOP_K)
+
+    async def _init_connection(self, conn):
+        from pgvector.asyncpg import register_vector
+
+        await register_vector(conn)
+        await conn.execute(f"SET hnsw.ef_search = {int(self.ef_search)}; SET ivfflat.probes = {int(PG_IVFFLAT_PROBES)}")
+
+    async def start(self):
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            self.database_url,
+            min_size=PG_POOL_MIN_SIZE,
+            max_size=PG_POOL_MAX_SIZE,
+            init=self._init_connection,
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+
+    async def search(self, question_embedding: np.ndarray, k: int = RETRIEVAL_TOP_K) -> tuple:
+        async with self.pool.acquire() as conn:
+            if k > self.ef_search:
+                await conn.execute(f"SET hnsw.ef_search = {int(k)}")
+            rows = await conn.fetch(
+                """
+                SELECT content, url, chunk_id, 1 - (embedding <=> $1) AS similarity
+                FROM boundless_chunks
+                ORDER BY embedding <=> $1
+                LIMIT $2
+                """,
+                question_embedding, k
+            )
+        return candidate_set(
+            [{'content': row['content'], 'url': row['url'], 'chunk_id': row['chunk_id']} for row in rows],
+            [row['similarity'] for row in rows],
+        )
+
+    async def count(self) -> int:
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval("SELECT count(*) FROM boundless_chunks")
+
+
+class ChromaBackend:
+    """boundless_docs Chroma koleksiyonu; sync client thread'de çalıştırılır"""
+    name = 'chroma'
+
+    def __init__(self, host: str = CHROMA_HOST, port: int = CHROMA_PORT, collection: str = CHROMA_COLLECTION):
+        self.host = host
+        self.port = port
+        self.collection_name = collection
+        self.collection = None
+
+    async def start(self):
+        import chromadb
+
+        client = await asyncio.to_thread(chromadb.HttpClient, host=self.host, port=self.port)
+        self.collection = await asyncio.to_thread(client.get_or_create_collection, self.collection_name)
+
+    async def close(self):
+        pass
+
+    def _similarity(self, distance: float) -> float:
+        # Chroma mesafeyi döndürür; normalize embedding'ler için cosine similarity'ye çevir
+        space = (self.collection.metadata or {}).get('hnsw:space', 'l2')
+        if space == 'l2':
+            return 1.0 - distance / 2.0  # squared L2 = 2 - 2cos
+        return 1.0 - distance  # cosine ve ip
+
+    async def search(self, question_embedding: np.ndarray, k: int = RETRIEVAL_TOP_K) -> tuple:
+        result = await asyncio.to_thread(
+            self.collection.query,
+            query_embeddings=[question_embedding.tolist()],
+            n_results=k,
+            include=['documents', 'metadatas', 'distances'],
+        )
+        return candidate_set(
+            [{'content': document, 'url': (meta or {}).get('url'), 'chunk_id': (meta or {}).get('chunk_id')}
+             for document, meta in zip(result['documents'][0], result['metadatas'][0])],
+            [self._similarity(d) for d in result['distances'][0]],
+        )
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self.collection.count)
+
+
+def create_backend(name: str, source) -> object:
+    """Ayar adına göre retrieval backend'i oluştur"""
+    if name == 'memory':
+        return InMemoryBackend(source)
+    if name == 'pgvector':
+        return PgVectorBackend()
+    if name == 'chroma':
+        return ChromaBackend()
+    raise ValueError(f"Unknown retrieval backend: {name}")
@@ -0,0 +1,164 @@
+"""PREDEFINED_QA yönlendirmesi için önceden derlenmiş eşleştirici
+
+Soru-cevap tablosu data/predefined_qa.json'dan import sırasında bir kez
+yüklenir. Sorular önceden tokenize edilir; term -> soru indeksi, özel
+kelime -> soru indeksi ve iki yönlü substring aramaları sayesinde her istekte
+sadece aday sorular skorlanır.
+Skor eski döngüyle birebir aynıdır: kelime örtüşmesi + tam eşleşme bonusu (5)
++ özel kelime ağırlıkları; en iyi skor >= 2 ise hazır cevap döner.
+
+PREDEFINED_MATCH_MODE=embedding ile keyword eşleşmesi yetersiz kaldığında
+önbelleğe alınmış soru embedding'leriyle cosine benzerliği de denenir.
+"""
+import bisect
+import json
+import os
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.keywords import SPECIAL_KEYWORDS, tokenize
+
+PREDEFINED_QA_PATH = os.getenv(
+    'PREDEFINED_QA_PATH', os.path.join(os.path.dirname(__file__), 'data', 'predefined_qa.json')
+)
+PREDEFINED_MATCH_MODE = os.getenv('PREDEFINED_MATCH_MODE', 'keyword')
+PREDEFINED_EMBEDDING_THRESHOLD = float(os.getenv('PREDEFINED_EMBEDDING_THRESHOLD', '0.8'))
+PREDEFINED_MIN_SCORE = 2
+
+# Sorular küçük harfli blob'da bu ayraçla birleştirilir (soru metinlerinde geçmez)
+SEPARATOR = '\x00'
+
+
+class PredefinedRouter:
+    def __init__(self, table: dict):
+        self.table = table
+        self.questions = list(table)
+        self.answers = list(table.values())
+        self.lowered = [question.lower() for question in self.questions]
+        self.word_sets = [tokenize(question) for question in self.questions]
+
+        # term -> bu kelimeyi içeren soru id'leri
+        self.term_index = {}
+        for i, words in enumerate(self.word_sets):
+            for word in words:
+                self.term_index.setdefault(word, []).append(i)
+
+        # özel kelime -> (ağırlık, bu kelimeyi substring olarak içeren soru id'leri)
+        self.special_index = {
+            word: (weight, [i for i, lowered in enumerate(self.lowered) if word in lowered])
+            for word, weight in SPECIAL_KEYWORDS.items()
+        }
+
+        # Hiç kelimesi olmayan sorular term indeksinden bulunamaz, her zaman aday
+        self.tokenless = [i for i, words in enumerate(self.word_sets) if not words]
+
+        # "soru, tablodaki sorunun parçası mı" kontrolü için tek blob + başlangıç offset'leri
+        self.blob = SEPARATOR.join(self.lowered)
+        self.offsets = []
+        position = 0
+        for lowered in self.lowered:
+            self.offsets.append(position)
+            position += len(lowered) + 1
+
+        # "tablodaki soru, gelen sorunun parçası mı" kontrolü: metin -> id'ler ve farklı uzunluklar
+        self.by_text = {}
+        for i, lowered in enumerate(self.lowered):
+            self.by_text.setdefault(lowered, []).append(i)
+        self.lengths = sorted(set(map(len, self.by_text)))
+
+        self.embeddings = None
+
+    @classmethod
+    def from_file(cls, path: str = PREDEFINED_QA_PATH) -> 'PredefinedRouter':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _substring_candidates(self, normalized_question: str) -> List[int]:
+        """normalized_question'ı içeren soruların id'leri"""
+        found = []
+        start = self.blob.find(normalized_question)
+        while start != -1:
+            i = bisect.bisect_right(self.offsets, start) - 1
+            found.append(i)
+            # Aynı soruda tekrar aramaya gerek yok, sonraki soruya atla
+            next_start = self.offsets[i + 1] if i + 1 < len(self.offsets) else len(self.blob)
+            start = self.blob.find(normalized_question, next_start)
+        return found
+
+    def _contained_candidates(self, normalized_question: str) -> List[int]:
+        """normalized_question içinde geçen soruların id'leri (sadece tablodaki uzunluklar taranır)"""
+        found = []
+        size = len(normalized_question)
+        for length in self.lengths:
+            if length > size:
+                break
+            seen = set()
+            for start in range(size - length + 1):
+                part = normalized_question[start:start + length]
+                if part not in seen:
+                    seen.add(part)
+                    found.extend(self.by_text.get(part, ()))
+        return found
+
+    def _score(self, i: int, normalized_question: str, question_words: set) -> int:
+        lowered = self.lowered[i]
+        # Anahtar kelime eşleşmesi
+        score = len(question_words & self.word_sets[i])
+        # Tam eşleşme kontrolü
+        if normalized_question in lowered or lowered in normalized_question:
+            score += 5  # Bonus puan
+        for word, (weight, _) in self.special_index.items():
+            if word in normalized_question and word in lowered:
+                score += weight
+        return score
+
+    def match(self, normalized_question: str, question_words: set) -> tuple:
+        """(cevap, skor) döndür; skor PREDEFINED_MIN_SCORE altındaysa cevap None"""
+        if not normalized_question:
+            # Boş string her sorunun parçası sayılır - eski davranışla aynı
+            candidates = range(len(self.questions))
+        else:
+            candidates = set(self.tokenless)
+            for word in question_words:
+                candidates.update(self.term_index.get(word, ()))
+            for word, (_, ids) in self.special_index.items():
+                if word in normalized_question:
+                    candidates.update(ids)
+            candidates.update(self._substring_candidates(normalized_question))
+            candidates.update(self._contained_candidates(normalized_question))
+            candidates = sorted(candidates)
+
+        best_answer = None
+        best_score = 0
+        for i in candidates:
+            score = self._score(i, normalized_question, question_words)
+            if score > best_score:
+                best_score = score
+                best_answer = self.answers[i]
+
+        if best_score >= PREDEFINED_MIN_SCORE:
+            return best_answer, best_score
+        return None, best_score
+
+    def prepare_embeddings(self, embed: Callable[[List[str]], np.ndarray]):
+        """Soru embedding'lerini bir kez hesapla ve önbelleğe al"""
+        if self.embeddings is None:
+            self.embeddings = embed(self.questions)
+
+    def match_embedding(self, question_embedding: np.ndarray, embed: Callable[[List[str]], np.ndarray],
+                        threshold: float = PREDEFINED_EMBEDDING_THRESHOLD) -> tuple:
+        """Önbellekteki normalize soru embedding'leriyle en yakın soruyu bul: (cevap, benzerlik) veya (None, benzerlik)"""
+        if not self.questions:
+            return None, 0.0
+        self.prepare_embeddings(embed)
+        similarities = self.embeddings @ question_embedding
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity >= threshold:
+            return self.answers[best], similarity
+        return None, similarity
+
+
+def load_router(path: Optional[str] = None) -> PredefinedRouter:
+    return PredefinedRouter.from_file(path or PREDEFINED_QA_PATH)
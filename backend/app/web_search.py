@@ -0,0 +1,252 @@
+"""Web araması fallback'i (DuckDuckGo Instant Answer API)
+
+Upstream'e giden her çağrı sırayla şu katmanlardan geçer:
+    önbellek      - normalize sorgu -> cevap, WEB_SEARCH_CACHE_TTL saniye (LRU)
+    birleştirme   - aynı sorgu zaten uçuştaysa yeni istek atılmaz, onun sonucu beklenir
+    devre kesici  - art arda WEB_SEARCH_BREAKER_FAILURES hata/timeout sonrası
+                    WEB_SEARCH_BREAKER_COOLDOWN saniye boyunca beklemeden hata döner,
+                    ardından tek bir deneme isteğiyle upstream yoklanır
+    token bucket  - saniyede WEB_SEARCH_RATE istek, WEB_SEARCH_BURST kadar ani yük
+    havuzlu client - en fazla WEB_SEARCH_CONCURRENCY eşzamanlı bağlantı
+
+Toplam süre bütçesi (rate limit beklemesi dahil) WEB_SEARCH_TIMEOUT'tur.
+WEB_SEARCH_URL yerel bir stub sunucuya yönlendirilebilir veya WebSearch'e
+kendi httpx transport'u verilebilir (bkz. `python -m app.benchmark web-search`).
+"""
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+WEB_SEARCH_URL = os.getenv('WEB_SEARCH_URL', 'https://api.duckduckgo.com/')
+WEB_SEARCH_CONCURRENCY = int(os.getenv('WEB_SEARCH_CONCURRENCY', '4'))
+WEB_SEARCH_TIMEOUT = float(os.getenv('WEB_SEARCH_TIMEOUT', '5'))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv('WEB_SEARCH_CACHE_SIZE', '512'))
+WEB_SEARCH_CACHE_TTL = float(os.getenv('WEB_SEARCH_CACHE_TTL', '600'))
+WEB_SEARCH_RATE = float(os.getenv('WEB_SEARCH_RATE', '5'))
+WEB_SEARCH_BURST = int(os.getenv('WEB_SEARCH_BURST', '10'))
+WEB_SEARCH_BREAKER_FAILURES = int(os.getenv('WEB_SEARCH_BREAKER_FAILURES', '5'))
+WEB_SEARCH_BREAKER_COOLDOWN = float(os.getenv('WEB_SEARCH_BREAKER_COOLDOWN', '30'))
+
+WEB_SEARCH_ERROR = "Sorry, I couldn't search the web at the moment."
+NO_WEB_RESULT = "I couldn't find specific information about that on the web."
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    return WHITESPACE_RE.sub(' ', query.lower()).strip()
+
+
+def extract_answer(data: dict) -> str:
+    """Instant Answer cevabından gösterilecek metni seç"""
+    if data.get('Abstract'):
+        return data['Abstract']
+    elif data.get('Answer'):
+        return data['Answer']
+    elif data.get('RelatedTopics') and len(data['RelatedTopics']) > 0:
+        return data['RelatedTopics'][0].get('Text', 'No information found.')
+    else:
+        return NO_WEB_RESULT
+
+
+class TokenBucket:
+    def __init__(self, rate: float = WEB_SEARCH_RATE, capacity: int = WEB_SEARCH_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, timeout: float) -> bool:
+        """Bir token al; timeout içinde token birikmeyecekse beklemeden False döndür"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        wait = (1 - self.tokens) / self.rate
+        if wait > timeout:
+            return False
+        # Token'ı şimdiden ayır (negatife düşer), sonra birikmesini bekle
+        self.tokens -= 1
+        await asyncio.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """closed -> (art arda hata) open -> (cooldown) half_open -> tek deneme -> closed | open"""
+
+    def __init__(self, failure_threshold: int = WEB_SEARCH_BREAKER_FAILURES,
+                 cooldown: float = WEB_SEARCH_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return 'open'
+        return 'half_open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.probing:
+            # Cooldown bitti: sadece bir istek upstream'i yoklar
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.probing:
+                self.opened += 1
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class WebSearch:
+    def __init__(self, url: str = WEB_SEARCH_URL, timeout: float = WEB_SEARCH_TIMEOUT,
+                 concurrency: int = WEB_SEARCH_CONCURRENCY, cache_size: int = WEB_SEARCH_CACHE_SIZE,
+                 cache_ttl: float = WEB_SEARCH_CACHE_TTL, rate: float = WEB_SEARCH_RATE,
+                 burst: int = WEB_SEARCH_BURST, breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.transport = transport
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.client = None
+        self.semaphore = None
+        # normalize sorgu -> (cevap, son geçerlilik zamanı); sıra = LRU sırası
+        self.cache = OrderedDict()
+        # normalize sorgu -> upstream'e giden tek task
+        self.inflight = {}
+        self.counters = {
+            'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'upstream_calls': 0,
+            'errors': 0, 'timeouts': 0, 'rate_limited': 0, 'short_circuited': 0,
+        }
+
+    def _client(self) -> httpx.AsyncClient:
+        # Event loop'a bağlı nesneler ilk kullanımda oluşturulur
+        if self.client is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.client = httpx.AsyncClient(
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self.client
+
+    def _cached(self, key: str) -> Optional[str]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        answer, expires_at = entry
+        if expires_at < time.monotonic():
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return answer
+
+    def _store(self, key: str, answer: str):
+        if self.cache_size <= 0:
+            return
+        self.cache[key] = (answer, time.monotonic() + self.cache_ttl)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def search(self, query: str) -> str:
+        """Sorgunun cevabı; upstream kullanılamazsa WEB_SEARCH_ERROR"""
+        self.counters['requests'] += 1
+        key = normalize_query(query)
+        answer = self._cached(key)
+        if answer is not None:
+            self.counters['cache_hits'] += 1
+            return answer
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._lookup(key, query))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.counters['coalesced'] += 1
+        # Bekleyen istek iptal edilirse ortak task diğerleri için sürmeli
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: str, query: str) -> str:
+        deadline = time.monotonic() + self.timeout
+        if not self.breaker.allow():
+            self.counters['short_circuited'] += 1
+            return WEB_SEARCH_ERROR
+        if not await self.bucket.acquire(deadline - time.monotonic()):
+            self.counters['rate_limited'] += 1
+            # Yerel sınır upstream'in sağlığı hakkında bilgi vermez; yoklama hakkını geri ver
+            self.breaker.probing = False
+            return WEB_SEARCH_ERROR
+        try:
+            data = await asyncio.wait_for(self._fetch(query), max(deadline - time.monotonic(), 0.001))
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            self.breaker.record_failure()
+            print(f"Web search timed out after {self.timeout}s")
+            return WEB_SEARCH_ERROR
+        except Exception as e:
+            self.counters['errors'] += 1
+            self.breaker.record_failure()
+            print(f"Web search error: {e}")
+            return WEB_SEARCH_ERROR
+        self.breaker.record_success()
+        answer = extract_answer(data)
+        self._store(key, answer)
+        return answer
+
+    async def _fetch(self, query: str) -> dict:
+        client = self._client()
+        async with self.semaphore:
+            self.counters['upstream_calls'] += 1
+            response = await client.get(self.url, params={
+                'q': query, 'format': 'json', 'no_html': 1, 'skip_disambig': 1
+            })
+            response.raise_for_status()
+            return response.json()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            'cache_size': len(self.cache),
+            'inflight': len(self.inflight),
+            'breaker': {'state': self.breaker.state, 'consecutive_failures': self.breaker.failures,
+                        'opened': self.breaker.opened},
+        }
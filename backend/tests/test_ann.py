@@ -0,0 +1,59 @@
+"""İlk aşama ANN index'leri (app.ann)"""
+import numpy as np
+import pytest
+
+from app.ann import ExactIndex, HnswIndex
+
+
+def unit_vectors(count: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_exact_index_returns_top_k_by_cosine():
+    embeddings = unit_vectors(50)
+    ids, similarities = ExactIndex(embeddings).search(embeddings[7], 5)
+    assert ids[0] == 7
+    assert len(ids) == 5
+    assert np.all(np.diff(similarities) <= 0)
+    np.testing.assert_allclose(similarities, embeddings[ids] @ embeddings[7], rtol=1e-5)
+
+
+def test_exact_index_skips_masked_rows():
+    embeddings = unit_vectors(50)
+    mask = np.ones(50, dtype=bool)
+    mask[[7, 8, 9]] = False
+    ids, _ = ExactIndex(embeddings, mask).search(embeddings[7], 10)
+    assert len(ids) == 10
+    assert not set(ids.tolist()) & {7, 8, 9}
+
+
+def test_exact_index_returns_fewer_when_few_rows_eligible():
+    embeddings = unit_vectors(20)
+    mask = np.zeros(20, dtype=bool)
+    mask[[3, 11]] = True
+    ids, _ = ExactIndex(embeddings, mask).search(embeddings[0], 10)
+    assert sorted(ids.tolist()) == [3, 11]
+
+
+def test_hnsw_labels_are_store_indices(tmp_path):
+    pytest.importorskip('hnswlib')
+    embeddings = unit_vectors(200)
+    mask = np.arange(200) % 3 != 0
+    index = HnswIndex.build(embeddings, mask)
+    ids, similarities = index.search(embeddings[1], 10)
+    assert ids[0] == 1
+    assert mask[ids].all()
+    np.testing.assert_allclose(similarities, embeddings[ids] @ embeddings[1], atol=1e-5)
+
+    index.save(str(tmp_path))
+    loaded = HnswIndex.load(str(tmp_path), 16, np.flatnonzero(mask))
+    assert loaded.search(embeddings[1], 10)[0].tolist() == ids.tolist()
+
+
+def test_hnsw_load_rejects_graph_for_other_rows(tmp_path):
+    pytest.importorskip('hnswlib')
+    embeddings = unit_vectors(100)
+    HnswIndex.build(embeddings).save(str(tmp_path))
+    with pytest.raises(ValueError):
+        HnswIndex.load(str(tmp_path), 16, np.arange(0, 100, 2))
@@ -0,0 +1,33 @@
+"""Kolon bazlı chunk deposu (app.chunk_store): kayıtlar save/load sonrası aynı kalmalı"""
+import numpy as np
+
+from app.chunk_store import ChunkStore
+from app.ingest import content_hash
+
+RECORDS = [
+    {'content': 'Title: Provers', 'url': 'https://docs.example/a', 'chunk_id': 0},
+    {'content': 'Provers bid on requests and submit proofs.', 'url': 'https://docs.example/a', 'chunk_id': 1},
+    {'content': 'Ünicode içerik de saklanır.', 'url': 'https://docs.example/b', 'chunk_id': 0},
+]
+
+
+def store_with_hashes() -> ChunkStore:
+    records = [dict(record, hash=content_hash(record['content'])) for record in RECORDS]
+    records.append({'content': 'Hash olmadan eklenen chunk.', 'url': 'https://docs.example/b'})
+    return ChunkStore.from_records(records, np.eye(len(records), 4, dtype=np.float32))
+
+
+def test_hashes_are_stored_as_ascii_bytes():
+    store = store_with_hashes()
+    assert store.hashes.dtype == np.dtype('S40')
+    assert store.record(0)['hash'] == content_hash('Title: Provers')
+    assert store.record(3)['hash'] == ''
+
+
+def test_records_survive_save_and_load(tmp_path):
+    store = store_with_hashes()
+    store.save(str(tmp_path))
+    loaded = ChunkStore.load(str(tmp_path))
+    assert [loaded.record(i) for i in range(len(loaded))] == [store.record(i) for i in range(len(store))]
+    assert loaded.record(2)['content'] == 'Ünicode içerik de saklanır.'
+    np.testing.assert_array_equal(loaded.embeddings, store.embeddings)
@@ -0,0 +1,111 @@
+"""Chunker ve HTML blok çıkarımı (app.chunking, app.ingest)"""
+from bs4 import BeautifulSoup
+
+from app.chunking import Chunker, approx_token_counts, split_sentences
+from app.ingest import BLOCK_TAGS, block_texts, extract_page_text
+
+
+def sentence(index: int, words: int = 5) -> str:
+    """words kelimelik, numaralı, noktayla biten cümle (yaklaşık sayımda words + 1 token)"""
+    return ' '.join([f"s{index}"] + ['word'] * (words - 1)) + '.'
+
+
+def tokens(text: str) -> int:
+    return approx_token_counts([text])[0]
+
+
+def test_nested_divs_yield_text_once():
+    soup = BeautifulSoup('<div><div><section><p>Only once here.</p></section></div></div>', 'html.parser')
+    assert block_texts(soup, BLOCK_TAGS) == ['Only once here.']
+
+
+def test_container_keeps_own_text_without_child_blocks():
+    soup = BeautifulSoup('<div>Intro text <b>bold</b><p>Child paragraph.</p></div>', 'html.parser')
+    assert block_texts(soup, ['div', 'p']) == ['Intro textbold', 'Child paragraph.']
+
+
+def test_repeated_blocks_are_deduplicated():
+    soup = BeautifulSoup('<p>Same text.</p><div><p>Same text.</p></div><li>Other text.</li>', 'html.parser')
+    assert block_texts(soup, ['p', 'li', 'div']) == ['Same text.', 'Other text.']
+
+
+def test_extract_page_text_titles_and_paragraphs():
+    html = ('<h1>Proof lifecycle</h1><div><div><p>A request is submitted to the market contract.</p></div></div>'
+            '<p>short</p>')
+    assert extract_page_text(html).split('\n') == [
+        'Title: Proof lifecycle',
+        'A request is submitted to the market contract.',
+    ]
+
+
+def test_split_sentences_on_punctuation_and_lines():
+    assert list(split_sentences("One two. Three four!\n\nFive six?  Seven")) == [
+        'One two.', 'Three four!', 'Five six?', 'Seven'
+    ]
+
+
+def test_chunks_respect_token_cap():
+    chunker = Chunker(max_tokens=20)
+    text = ' '.join(sentence(i, words=4 + i % 7) for i in range(60))
+    chunks = chunker(text)
+    assert len(chunks) > 1
+    assert all(tokens(chunk) <= 20 for chunk in chunks)
+    # Overlap yokken her cümle tam bir kez
+    assert ' '.join(chunks).split() == text.split()
+
+
+def test_long_sentence_is_split_on_word_boundaries():
+    chunker = Chunker(max_tokens=10)
+    long_sentence = ' '.join(f"w{i}" for i in range(45))
+    chunks = chunker(long_sentence)
+    assert len(chunks) >= 5
+    assert all(tokens(chunk) <= 10 for chunk in chunks)
+    assert ' '.join(chunks).split() == long_sentence.split()
+
+
+def test_max_tokens_is_capped_by_model_limit():
+    assert Chunker(max_tokens=10_000).max_tokens < 10_000
+
+
+def test_overlap_carries_trailing_sentences():
+    # 6 token'lık cümleler: chunk başına 3 cümle, sonuncusu bir sonrakine taşınır
+    chunker = Chunker(max_tokens=18, overlap_tokens=6)
+    sentences = [sentence(i) for i in range(7)]
+    chunks = chunker(' '.join(sentences))
+    assert chunks[0] == ' '.join(sentences[0:3])
+    assert chunks[1] == ' '.join(sentences[2:5])
+    assert chunks[2] == ' '.join(sentences[4:7])
+    assert all(tokens(chunk) <= 18 for chunk in chunks)
+
+
+def test_overlap_only_tail_is_not_emitted():
+    chunker = Chunker(max_tokens=18, overlap_tokens=6)
+    chunks = chunker(' '.join(sentence(i) for i in range(3)))
+    assert len(chunks) == 1
+
+
+def test_overlap_is_capped_at_half_of_max_tokens():
+    assert Chunker(max_tokens=20, overlap_tokens=50).overlap_tokens == 10
+
+
+def test_duplicate_chunks_are_skipped():
+    # Her satır tam bir chunk (12 token); üçüncü satır ilkinin aynısı
+    chunker = Chunker(max_tokens=12)
+    block = ' '.join(sentence(i) for i in range(2))
+    other = sentence(9, words=11)
+    assert chunker('\n'.join([block, other, block])) == [block, other]
+
+
+def test_min_words_drops_short_chunks():
+    chunker = Chunker(max_tokens=6, min_words=3)
+    assert chunker("Tiny.\nThis one is long enough.") == ['This one is long enough.']
+
+
+def test_model_tokenizer_is_used_when_given():
+    class WhitespaceTokenizer:
+        def __call__(self, items, add_special_tokens=False):
+            return {'input_ids': [item.split() for item in items]}
+
+    chunker = Chunker(max_tokens=4, tokenizer=WhitespaceTokenizer, tokenizer_name='ws')
+    assert chunker("a b c. d e f. g h.") == ['a b c.', 'd e f.', 'g h.']
+    assert chunker.params()['tokenizer'] == 'ws'
@@ -0,0 +1,39 @@
+"""ONNX/int8 embedding backend'lerinin torch referansıyla top-k örtüşmesi (app.benchmark.embed_parity)
+
+ONNX ek paketleri (requirements-onnx.txt) veya model yoksa atlanır; int8 için
+önce python -m app.export_embedder çalıştırılmış olmalı.
+"""
+import os
+
+import pytest
+
+from app.benchmark import SAMPLE_QUESTIONS, embed_parity, synthetic_corpus
+from app.embeddings import export_path, int8_file_name, load_embedder
+from app.router import load_router
+
+pytest.importorskip('sentence_transformers')
+pytest.importorskip('onnxruntime')
+pytest.importorskip('optimum')
+
+MIN_OVERLAP = 0.9
+K = 10
+
+
+@pytest.fixture(scope='module')
+def parity_inputs():
+    try:
+        load_embedder('torch')
+    except OSError as e:
+        pytest.skip(f"embedding model unavailable: {e}")
+    texts = [chunk['content'] for chunk in synthetic_corpus(300, 1)[0]]
+    return texts, SAMPLE_QUESTIONS + load_router().questions
+
+
+@pytest.mark.parametrize('backend', ['onnx', 'int8'])
+def test_backend_top_k_matches_torch(backend, parity_inputs):
+    if backend == 'int8' and not os.path.exists(os.path.join(export_path(), int8_file_name())):
+        pytest.skip("int8 model not exported")
+    texts, questions = parity_inputs
+    result = embed_parity([backend], texts, questions, K)[backend]
+    assert result['overlap'] >= MIN_OVERLAP, result
+    assert result['cosine'] > 0.95, result
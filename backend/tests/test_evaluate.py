@@ -0,0 +1,40 @@
+"""Offline değerlendirmenin korpus hattı (app.evaluate); sentetik korpus sadece burada kullanılır"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from app import evaluate
+from app.chunking import Chunker
+from app.ingest import extract_page_text, ingest
+
+SYNTHETIC_CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'synthetic_corpus.json')
+
+
+def load_pages() -> dict:
+    with open(SYNTHETIC_CORPUS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_fixture_client_serves_corpus_pages():
+    pages = load_pages()
+
+    async def collect():
+        records = []
+        async with evaluate.fixture_client(pages) as client:
+            async for batch, _ in ingest(list(pages) + ['https://docs.example/missing'], extract_page_text,
+                                         Chunker(max_tokens=64), client=client):
+                records.extend(batch)
+        return records
+
+    records = asyncio.run(collect())
+    assert {record['url'] for record in records} == set(pages)
+
+
+def test_missing_corpus_asks_for_snapshot(tmp_path, monkeypatch):
+    corpus = tmp_path / 'eval_corpus.json'
+    monkeypatch.setattr(sys, 'argv', ['evaluate', '--corpus', str(corpus)])
+    with pytest.raises(SystemExit, match='--snapshot-corpus'):
+        evaluate.main()
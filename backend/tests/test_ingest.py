@@ -0,0 +1,51 @@
+"""Incremental ingest: sayfa durumu ve korunan chunk'ların konumları (app.ingest)"""
+import asyncio
+
+import httpx
+
+from app.chunking import Chunker
+from app.ingest import content_hash, diff_pages, extract_text, ingest
+
+URL = 'https://docs.example/page'
+
+
+def run(html: str, known: dict) -> tuple:
+    """Sayfayı tek satırlık chunk'larla ingest et; bilinen hash'ler atlanır: (yeni kayıtlar, sayfa durumu)"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=html)))
+    pages = {}
+
+    async def collect():
+        records = []
+        async with client:
+            async for batch, _ in ingest([URL], extract_text, Chunker(max_tokens=4), client=client, pages=pages,
+                                         skip=lambda record: record['hash'] in known):
+                records.extend(batch)
+        return records
+
+    return asyncio.run(collect()), pages
+
+
+def test_positions_follow_edited_page():
+    first = '<p>Alpha one two.</p><p>Beta three four.</p><p>Gamma five six.</p>'
+    records, pages = run(first, {})
+    assert [r['chunk_id'] for r in records] == [0, 1, 2]
+    known = {r['hash']: r['chunk_id'] for r in records}
+
+    # Başa paragraf eklendi: yeni chunk embed edilir, korunanların konumu kayar
+    records, pages = run('<p>Intro zero zero.</p>' + first, known)
+    assert [(r['content'], r['chunk_id']) for r in records] == [('Intro zero zero.', 0)]
+    positions = pages[URL]['chunk_positions']
+    assert positions[content_hash('Alpha one two.')] == 1
+    assert positions[content_hash('Gamma five six.')] == 3
+
+    removed, stats = diff_pages(pages, {URL: set(known)}, len(records))
+    assert removed == {}
+    assert stats == {'skipped': 3, 'added': 1, 'removed': 0}
+
+
+def test_duplicate_chunk_keeps_first_position():
+    _, pages = run('<p>Same words here.</p><p>Other words here.</p><li>Same words here.</li>', {})
+    assert pages[URL]['chunk_positions'] == {
+        content_hash('Same words here.'): 0,
+        content_hash('Other words here.'): 1,
+    }
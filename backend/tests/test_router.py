@@ -0,0 +1,74 @@
+"""PREDEFINED_QA eşleştiricisi (app.router) eski döngüyle aynı sonucu vermeli"""
+import random
+import re
+
+import pytest
+
+from app.keywords import SPECIAL_KEYWORDS
+from app.router import PREDEFINED_MIN_SCORE, PredefinedRouter, load_router
+
+ANSWER = {"answer": "help", "source_url": "https://example.com/help", "source": "predefined"}
+
+
+def legacy_match(table: dict, normalized_question: str, question_words: set) -> tuple:
+    """Router'dan önceki /ask döngüsü"""
+    best_match = None
+    best_score = 0
+    for predefined_q, predefined_a in table.items():
+        predefined_words = set(re.findall(r'\w+', predefined_q.lower()))
+        score = len(question_words & predefined_words)
+        if normalized_question in predefined_q.lower() or predefined_q.lower() in normalized_question:
+            score += 5
+        for word, weight in SPECIAL_KEYWORDS.items():
+            if word in normalized_question and word in predefined_q.lower():
+                score += weight
+        if score > best_score:
+            best_score = score
+            best_match = predefined_a
+    if best_score >= PREDEFINED_MIN_SCORE:
+        return best_match, best_score
+    return None, best_score
+
+
+def match(router: PredefinedRouter, question: str) -> tuple:
+    normalized_question = question.lower().strip()
+    return router.match(normalized_question, set(re.findall(r'\w+', normalized_question)))
+
+
+def test_predefined_question_inside_longer_question():
+    # "help" sorudaki hiçbir kelimeyle örtüşmüyor; sadece substring bonusu eşleştirir
+    router = PredefinedRouter({"Help": ANSWER})
+    assert match(router, "helpme please") == (ANSWER, 5)
+
+
+def test_predefined_question_contained_anywhere():
+    router = PredefinedRouter({"Help": ANSWER, "What is X?": {**ANSWER, "answer": "x"}})
+    assert match(router, "pleasehelpme")[0] is ANSWER
+    assert match(router, "so, what is x?? thanks")[0]["answer"] == "x"
+
+
+def test_user_question_inside_predefined_question():
+    router = PredefinedRouter({"Help": ANSWER})
+    assert match(router, "elp") == (ANSWER, 5)
+
+
+def test_matches_legacy_loop_on_random_questions():
+    table = load_router().table
+    router = PredefinedRouter(table)
+    pieces = [q.lower() for q in table] + list(SPECIAL_KEYWORDS) + ['please', 'help', 'what', '?', ' ', 'x']
+    rng = random.Random(0)
+    for _ in range(2000):
+        question = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 4)))
+        if rng.random() < 0.3 and question:
+            start = rng.randrange(len(question))
+            question = question[start:start + rng.randint(1, 20)]
+        normalized_question = question.lower().strip()
+        question_words = set(re.findall(r'\w+', normalized_question))
+        assert router.match(normalized_question, question_words) == \
+            legacy_match(table, normalized_question, question_words), question
+
+
+@pytest.mark.parametrize('question', ['', '   '])
+def test_empty_question_matches_legacy(question):
+    table = load_router().table
+    assert match(PredefinedRouter(table), question) == legacy_match(table, question.strip(), set())
@@ -0,0 +1,45 @@
+"""Cold start regresyonu: app.main import'u ve /health/live bütçe içinde kalmalı (app.benchmark startup ile aynı ölçüm)
+
+STARTUP_MODE=off ile sunucu model indirmez ve scrape etmez; test ağa çıkmaz.
+Import süresi makineye göre oynadığı için duvar saati kontrolü sadece
+STARTUP_IMPORT_BUDGET verilince yapılır; her koşuda pahalı modüllerin import
+sırasında yüklenmediği kontrol edilir.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.benchmark import free_port, measure_startup
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Model ve index arka planda yüklenir; import ve canlılık bunları beklememeli
+STARTUP_IMPORT_BUDGET = os.getenv('STARTUP_IMPORT_BUDGET')
+STARTUP_LIVE_BUDGET = float(os.getenv('STARTUP_LIVE_BUDGET', '5'))
+# app.main import'unda yüklenmemesi gereken, saniyeler süren modüller
+HEAVY_MODULES = ['torch', 'sentence_transformers', 'transformers', 'onnxruntime']
+
+
+@pytest.fixture(scope='module')
+def startup(tmp_path_factory):
+    env = dict(os.environ, STARTUP_MODE='off', BOUNDLESS_INDEX_DIR=str(tmp_path_factory.mktemp('index')))
+    return measure_startup(runs=3, port=free_port(), timeout=60, wait_ready=False, env=env)
+
+
+def test_import_skips_heavy_modules():
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        f"import sys; import app.main; print('loaded:', [m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    ], cwd=BACKEND_DIR, env=dict(os.environ, STARTUP_MODE='off'), text=True)
+    assert 'loaded: []' in output.splitlines(), output
+
+
+@pytest.mark.skipif(STARTUP_IMPORT_BUDGET is None, reason="set STARTUP_IMPORT_BUDGET to check import wall time")
+def test_import_within_budget(startup):
+    assert startup['import_s'] <= float(STARTUP_IMPORT_BUDGET)
+
+
+def test_live_within_budget(startup):
+    assert startup['live_s'] is not None, "server never answered /health/live"
+    assert startup['live_s'] <= STARTUP_LIVE_BUDGET
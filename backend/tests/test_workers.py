@@ -0,0 +1,38 @@
+"""Çok worker'lı servis: /ask yükü altında yeni generation yayınlanınca hiçbir istek düşmemeli
+ve her worker yeni generation'a geçmeli (app.benchmark workers --check ile aynı senaryo)
+
+Embedding modeli yoksa atlanır; WORKERS_TEST_* ile boyutlar ayarlanabilir.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.benchmark import free_port
+from app.embeddings import load_embedder
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = int(os.getenv('WORKERS_TEST_WORKERS', '2'))
+DURATION = float(os.getenv('WORKERS_TEST_DURATION', '10'))
+
+
+@pytest.fixture(scope='module')
+def embedding_model():
+    pytest.importorskip('sentence_transformers')
+    try:
+        load_embedder('torch')
+    except OSError as e:
+        pytest.skip(f"embedding model unavailable: {e}")
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="worker discovery reads /proc")
+def test_generation_swap_under_load(embedding_model):
+    result = subprocess.run([
+        sys.executable, '-m', 'app.benchmark', 'workers', '--workers', str(WORKERS), '--chunks', '2000',
+        '--duration', str(DURATION), '--refreshes', '2', '--concurrency', '8', '--port', str(free_port()),
+        '--timeout', '120', '--check'
+    ], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'errors=0' in result.stdout, result.stdout
+    assert result.stdout.count(f"{WORKERS}/{WORKERS} workers switched") == 2, result.stdout